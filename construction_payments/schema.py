@@ -0,0 +1,140 @@
+"""
+Cached OpenAPI schema for the Construction Payments API.
+
+The schema is generated once per deploy (`python manage.py generate_openapi_schema`)
+or lazily on the first request, then served from memory with an ETag. drf-yasg is
+only imported when a documentation URL is actually hit, which keeps it (and the
+schema generator's walk over every view and serializer) off the worker boot path.
+"""
+import hashlib
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import condition, require_safe
+
+# format suffix (as captured by the `schema-json` URL) -> response content type
+SCHEMA_FORMATS = {
+    '.json': 'application/json',
+    '.yaml': 'application/yaml',
+}
+
+_schema_cache = {}  # format -> (content bytes, etag)
+_schema_lock = threading.Lock()
+
+
+def get_api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Construction Payments API",
+        default_version='v1',
+        description="API for managing construction progress payments.",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@yourproject.local"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def schema_file_path(format):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'swagger{format}'
+
+
+def generate_schema():
+    """
+    Walk the URLconf and build the public schema document.
+    No request is involved, so the result carries no host and is valid for every deployment.
+    """
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(get_api_info())
+    return generator.get_schema(request=None, public=True)
+
+
+def encode_schema(schema, format):
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+    codec = OpenAPICodecJson(validators=[]) if format == '.json' else OpenAPICodecYaml(validators=[])
+    return codec.encode(schema)
+
+
+def write_schema_files():
+    """
+    Generate the schema and write every format to OPENAPI_SCHEMA_DIR. Returns the written paths.
+    """
+    schema = generate_schema()
+    paths = []
+    for format in SCHEMA_FORMATS:
+        path = schema_file_path(format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(encode_schema(schema, format))
+        paths.append(path)
+    return paths
+
+
+def get_cached_schema(format):
+    """
+    Return (content, etag) for `format`, loading the schema at most once per process.
+    Pre-generated files are used outside DEBUG; otherwise the schema is generated on first use.
+    """
+    cached = _schema_cache.get(format)
+    if cached is None:
+        with _schema_lock:
+            if format not in _schema_cache:
+                _load_schema_cache()
+        cached = _schema_cache[format]
+    return cached
+
+
+def _load_schema_cache():
+    paths = {format: schema_file_path(format) for format in SCHEMA_FORMATS}
+    if not settings.DEBUG and all(path.exists() for path in paths.values()):
+        contents = {format: path.read_bytes() for format, path in paths.items()}
+    else:
+        schema = generate_schema()
+        contents = {format: encode_schema(schema, format) for format in SCHEMA_FORMATS}
+    for format, content in contents.items():
+        _schema_cache[format] = (content, _etag(content))
+
+
+def clear_schema_cache():
+    _schema_cache.clear()
+
+
+def _etag(content):
+    return '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+@require_safe
+@condition(etag_func=lambda request, format: get_cached_schema(format)[1])
+def schema_view(request, format):
+    """
+    Serve the cached schema as JSON or YAML. `condition` answers If-None-Match with a 304.
+    """
+    content, _ = get_cached_schema(format)
+    response = HttpResponse(content, content_type=SCHEMA_FORMATS[format])
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@lru_cache(maxsize=None)
+def _ui_view(renderer):
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    view_class = get_schema_view(
+        get_api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,), # Allow anyone to view docs
+    )
+    return view_class.with_ui(renderer, cache_timeout=0)
+
+
+def schema_ui_view(request, renderer):
+    """
+    Swagger UI / ReDoc page. The page itself is cheap (it doesn't walk the API);
+    it loads the document from `schema_view` via SWAGGER_SETTINGS/REDOC_SETTINGS['SPEC_URL'].
+    """
+    return _ui_view(renderer)(request)
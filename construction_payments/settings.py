@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'payments.middleware.CompressionMiddleware',  # gzip/brotli, incl. streamed list responses; keep near the top
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -157,6 +158,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# User uploads (site videos)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -174,9 +179,61 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',   # For browsable API in browser (keep this)
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'payments.renderers.ORJSONRenderer', # orjson-backed, same output as rest_framework.renderers.JSONRenderer
     ],
 }
 
+# drf-yasg: Swagger UI / ReDoc load the cached document served by construction_payments.schema
+# instead of regenerating it through their own `?format=openapi` request.
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Transactional outbox (payments/outbox.py): downstream sinks and dispatcher tuning for `manage.py dispatch_outbox`.
+# Every sink receives every batch. Other backends: 'payments.outbox.FileSink' (OPTIONS: {'PATH': ...}) and
+# 'payments.outbox.HTTPSink' (OPTIONS: {'URL': ..., 'TIMEOUT': 5, 'HEADERS': {...}}); with DEBUG on, the stub
+# receiver at http://127.0.0.1:8000/api/outbox-stub/ can stand in for a real endpoint.
+OUTBOX_SINKS = [
+    {'BACKEND': 'payments.outbox.LogSink'},
+]
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_BACKOFF_BASE_SECONDS = 2
+OUTBOX_BACKOFF_MAX_SECONDS = 600
+
+# Hot/cold archival (`manage.py archive_settled_payments`): Completed/Failed payments older than this
+# move to the archive tables, ARCHIVE_CHUNK_SIZE payments per database transaction.
+ARCHIVE_SETTLED_AFTER_DAYS = 365
+ARCHIVE_CHUNK_SIZE = 500
+
+# Paystack history import (`manage.py import_paystack_history`, admin "Import Paystack export"):
+# export records written per database transaction (and per bulk_create/COPY).
+PAYSTACK_IMPORT_BATCH_SIZE = 5000
+
+# Site video ingestion (payments/video.py; needs the optional PyAV and Pillow packages). Only keyframes and
+# scene changes are analyzed: at most VIDEO_SAMPLE_MAX_FPS frames per second of video, skipping frames whose
+# difference hash differs from a recently selected frame by at most VIDEO_DEDUP_MAX_DIFFERENCE (0-1).
+# VIDEO_SCENE_CHANGE_THRESHOLD is the mean pixel difference (0-1) that counts as a new scene; 0 = keyframes only.
+# Uploads are stored as 'pending' and processed by `manage.py process_site_videos`; each of those workers
+# analyzes frames with PROGRESS_FRAME_ANALYZER in VIDEO_ANALYSIS_WORKERS processes (None: one per CPU).
+# There is no default analyzer: until the object-detection model's analyzer is configured, uploads are refused
+# (503). {'BACKEND': 'payments.video.SimulatedFrameAnalyzer'} exercises the pipeline, but its results are only
+# shown as 'unverified' and never count as verified progress. Uploads over VIDEO_UPLOAD_MAX_BYTES get a 413.
+VIDEO_SAMPLE_MAX_FPS = 1.0
+VIDEO_SCENE_CHANGE_THRESHOLD = 0.25
+VIDEO_DEDUP_MAX_DIFFERENCE = 0.1
+VIDEO_ANALYSIS_WORKERS = None
+VIDEO_UPLOAD_MAX_BYTES = 1024 * 1024 * 1024 # 1 GB
+PROGRESS_FRAME_ANALYZER = None
+
+# Pre-generated schema files, written by `python manage.py generate_openapi_schema` at build time.
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+
+# The browsable API is a development aid; it costs a template render per request, so only enable it with DEBUG.
+if DEBUG:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rest_framework.renderers.BrowsableAPIRenderer')
+
 
@@ -1,25 +1,402 @@
 # payments/admin.py
 
-from django.contrib import admin
-from .models import Payment, Transaction # Import your models
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import IS_FACETS_VAR, PAGE_VAR, ChangeList
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from .models import (
+    ArchivedPayment, ArchivedTransaction, Milestone, OutboxEvent, Payment, ProgressResult, Project, SiteVideo,
+    Transaction,
+) # Import your models
+from .eligibility import PAID_STATUSES, apply_payment_change, rebuild_totals, record_progress
+from .importers import PaystackImporter, guess_format, iter_records
+from .paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+# Query-string parameter for keyset ("next page by id") navigation in large changelists.
+CURSOR_VAR = 'before_id'
+
+PAYMENT_STATUSES = ('Pending', 'Approved', 'Rejected', 'Completed', 'Failed')
+TRANSACTION_STATUSES = ('Initiated', 'Processed', 'Completed', 'Failed', 'Refunded')
+
+
+def _is_id(term):
+    return term.isdigit() and len(term) <= 18 # fits a bigint primary key
+
+
+class StatusListFilter(admin.SimpleListFilter):
+    """
+    Status filter with a fixed set of choices.
+    The default filter for a plain CharField runs SELECT DISTINCT over the whole table to build its choices.
+    """
+    title = 'status'
+    parameter_name = 'status'
+    statuses = ()
+
+    def lookups(self, request, model_admin):
+        return [(status, status) for status in self.statuses]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+        return queryset
+
+
+class PaymentStatusListFilter(StatusListFilter):
+    statuses = PAYMENT_STATUSES
+
+
+class TransactionStatusListFilter(StatusListFilter):
+    statuses = TRANSACTION_STATUSES
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList with optional keyset navigation: `?before_id=<pk>` lists the rows that come after
+    that row in the current ordering, using an index instead of a growing OFFSET.
+    Works for descending orderings on the primary key, or on one non-null field with the primary key
+    as tie-breaker (the default `-payment_date, -pk`); other sorts get no cursor link.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+        # Filter, search and date links start again from the newest rows.
+        self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+        self.first_page_url = self.get_query_string(remove=[PAGE_VAR])
+        self.remove_facet_link = self.get_query_string(remove=[IS_FACETS_VAR])
+        self.add_facet_link = self.get_query_string({IS_FACETS_VAR: True})
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_keyset_field(self, request):
+        """
+        'pk' for an ordering of `-pk`, the field name for `-<field>, -pk`, or None if the
+        ordering can't be paged by key.
+        """
+        pk_names = ('pk', self.lookup_opts.pk.name)
+        ordering = []
+        # The root queryset: get_ordering() appends the queryset's own order_by().
+        for field in self.get_ordering(request, self.root_queryset):
+            if not isinstance(field, str) or not field.startswith('-'):
+                return None # ascending or expression sorts
+            ordering.append('pk' if field[1:] in pk_names else field[1:])
+        if ordering == ['pk']:
+            return 'pk'
+        if len(ordering) == 2 and ordering[1] == 'pk' and '__' not in ordering[0]:
+            if not self.lookup_opts.get_field(ordering[0]).null:
+                return ordering[0]
+        return None
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.cursor is None:
+            return queryset
+        keyset_field = self.get_keyset_field(request)
+        try:
+            cursor = int(self.cursor)
+        except ValueError:
+            raise IncorrectLookupParameters
+        if keyset_field is None:
+            raise IncorrectLookupParameters
+        if keyset_field == 'pk':
+            return queryset.filter(pk__lt=cursor)
+        try:
+            # The cursor row's sort value: one primary key lookup.
+            value = self.model._default_manager.values_list(keyset_field, flat=True).get(pk=cursor)
+        except self.model.DoesNotExist:
+            raise IncorrectLookupParameters
+        return queryset.filter(
+            Q(**{f'{keyset_field}__lt': value}) | Q(**{keyset_field: value, 'pk__lt': cursor})
+        )
+
+    def get_results(self, request):
+        super().get_results(request)
+        # Evaluated once here; the results template iterates the same cached queryset.
+        results = list(self.result_list)
+        self.next_cursor_url = None
+        if (self.multi_page and len(results) == self.list_per_page
+                and self.get_keyset_field(request) is not None):
+            self.next_cursor_url = self.get_query_string({CURSOR_VAR: results[-1].pk}, [PAGE_VAR])
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for tables with millions of rows:
+    estimated counts instead of COUNT(*), no second unfiltered COUNT(*), only index-backed
+    sorting, an index-driven date hierarchy and optional keyset navigation.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/payments/large_table_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class PaystackImportForm(forms.Form):
+    export = forms.FileField(help_text="Paystack CSV export, JSON array or JSON lines.")
+    username = forms.CharField(label="Contractor username", max_length=150)
+    amount_unit = forms.ChoiceField(
+        choices=(('', "From the file type (CSV: naira, JSON: kobo)"), ('major', "Naira / major units"),
+                 ('subunit', "Kobo / subunits")),
+        required=False,
+    )
+
+    def clean_username(self):
+        try:
+            return User.objects.get(username=self.cleaned_data['username'])
+        except User.DoesNotExist:
+            raise forms.ValidationError("No user with this username.")
+
+
+class BasePaymentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """
+    List, filters and exact search shared by the live and the archived payments admin.
+    """
+    list_display = ('id', 'user', 'amount', 'payment_method', 'payment_date', 'status', 'milestone')
+    list_select_related = ('user', 'milestone')
+    list_filter = (PaymentStatusListFilter, 'payment_date')
+    date_hierarchy = 'payment_date'
+    sortable_by = ('id', 'payment_date')
+    search_fields = ('=id', '=paystack_reference', '=user__username')
+    search_help_text = "Exact payment ID, Paystack reference or username."
+    raw_id_fields = ('user', 'milestone')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact matches only, so every search is an index lookup (no icontains scans or joins).
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if _is_id(term):
+            return queryset.filter(Q(pk=int(term)) | Q(paystack_reference=term)), False
+        users = User.objects.filter(username=term).values('pk')
+        return queryset.filter(Q(paystack_reference=term) | Q(user__in=users)), False
+
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(BasePaymentAdmin):
     """
     Admin configuration for the Payment model.
-    Displays key fields in the list view and allows searching/filtering.
+    Displays key fields in the list view and allows searching/filtering and importing Paystack history.
     """
-    list_display = ('id', 'user', 'amount', 'payment_method', 'payment_date', 'status')
-    list_filter = ('payment_method', 'status', 'payment_date')
-    search_fields = ('user__username', 'user__email', 'id')
-    raw_id_fields = ('user',)
+    change_list_template = 'admin/payments/payment_change_list.html'
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is not None and obj.status in PAID_STATUSES:
+            # Reopening a paid-out payment would make its milestone progress releasable again.
+            readonly_fields = (*readonly_fields, 'status')
+        return readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        """
+        Keep the milestone running totals in step with milestone, amount and status edits made here.
+        """
+        initial = form.initial if change else {}
+        super().save_model(request, obj, form, change)
+        if not change or {'milestone', 'amount', 'status'} & set(form.changed_data):
+            apply_payment_change(obj, initial.get('milestone'), initial.get('amount'), initial.get('status'))
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='%s_%s_import' % info),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Upload a Paystack export for a contractor. Runs in the request, streaming the uploaded file;
+        for very large exports prefer `manage.py import_paystack_history`, which can resume.
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = PaystackImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            export = form.cleaned_data['export']
+            format = guess_format(export.name)
+            amount_unit = form.cleaned_data['amount_unit'] or ('major' if format == 'csv' else 'subunit')
+            importer = PaystackImporter(form.cleaned_data['username'], in_subunits=amount_unit == 'subunit')
+            try:
+                stream = io.TextIOWrapper(export.open('rb'), encoding='utf-8-sig', newline='')
+                stats = importer.run(iter_records(stream, format))
+            except ValueError as e: # undecodable or truncated file; earlier batches stay imported
+                self.message_user(request, f"Import stopped: {e}", messages.ERROR)
+            else:
+                self.message_user(request, (
+                    f"Imported {stats.imported} payments in {stats.elapsed:.1f}s "
+                    f"({stats.imported_per_second:,.0f} rows/s); skipped {stats.duplicates} duplicates "
+                    f"and {stats.invalid} invalid records."
+                ), messages.WARNING if stats.invalid else messages.SUCCESS)
+                for number, message in stats.errors:
+                    self.message_user(request, f"Record {number}: {message}", messages.WARNING)
+                return redirect('admin:%s_%s_changelist' % (self.opts.app_label, self.opts.model_name))
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': "Import Paystack export",
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/payments/payment_import.html', context)
+
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """
     Admin configuration for the Transaction model.
     """
     list_display = ('id', 'payment', 'amount', 'transaction_date', 'status')
-    list_filter = ('status', 'transaction_date')
-    search_fields = ('payment__id', 'id')
+    list_select_related = ('payment__user',) # Payment.__str__ shows the username
+    list_filter = (TransactionStatusListFilter, 'transaction_date')
+    date_hierarchy = 'transaction_date'
+    sortable_by = ('id', 'transaction_date')
+    search_fields = ('=id', '=payment__id', '=paystack_charge_id')
+    search_help_text = "Exact transaction ID, payment ID or Paystack charge ID."
     raw_id_fields = ('payment',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact matches only, so every search is an index lookup.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if _is_id(term):
+            return queryset.filter(Q(pk=int(term)) | Q(payment_id=int(term)) | Q(paystack_charge_id=term)), False
+        return queryset.filter(paystack_charge_id=term), False
+
+
+class ReadOnlyAdminMixin:
+    """
+    View-only admin: archived rows are never edited, added or deleted by hand.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedPayment)
+class ArchivedPaymentAdmin(ReadOnlyAdminMixin, BasePaymentAdmin):
+    """
+    Read-only admin for archived payments; same list, filters and exact search as PaymentAdmin.
+    """
+    list_display = BasePaymentAdmin.list_display + ('archived_at',)
+
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(ReadOnlyAdminMixin, TransactionAdmin):
+    """
+    Read-only admin for archived transactions.
+    """
+    list_display = TransactionAdmin.list_display + ('archived_at',)
+
+
+RUNNING_TOTAL_FIELDS = ('earned_amount', 'paid_amount', 'committed_amount', 'releasable_amount')
+
+
+class MilestoneInline(admin.TabularInline):
+    model = Milestone
+    fields = ('name', 'order', 'amount', 'verified_progress_percentage') + RUNNING_TOTAL_FIELDS
+    readonly_fields = ('verified_progress_percentage',) + RUNNING_TOTAL_FIELDS
+    extra = 0
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for projects. Running totals are maintained by the eligibility engine.
+    """
+    list_display = ('id', 'name', 'owner', 'created_at') + RUNNING_TOTAL_FIELDS
+    list_select_related = ('owner',)
+    search_fields = ('=id', 'name')
+    raw_id_fields = ('owner',)
+    readonly_fields = RUNNING_TOTAL_FIELDS
+    inlines = [MilestoneInline]
+    actions = ['rebuild_running_totals']
+
+    @admin.action(description="Rebuild running totals from progress results and payments")
+    def rebuild_running_totals(self, request, queryset):
+        for project in queryset:
+            rebuild_totals(project)
+        self.message_user(request, f"Rebuilt totals for {queryset.count()} project(s).")
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # A milestone's amount changes what its verified progress is worth.
+        if any('amount' in inline_form.changed_data for formset in formsets for inline_form in formset.forms):
+            rebuild_totals(form.instance)
+
+
+@admin.register(ProgressResult)
+class ProgressResultAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for AI-verified progress results. Adding one here updates the milestone like the pipeline does.
+    """
+    list_display = ('id', 'milestone', 'verified_progress_percentage', 'source', 'created_at')
+    list_select_related = ('milestone',)
+    search_fields = ('=milestone__id',)
+    raw_id_fields = ('milestone',)
+
+    def has_change_permission(self, request, obj=None):
+        return False # results are immutable; the running totals depend on them
+
+    def save_model(self, request, obj, form, change):
+        result = record_progress(obj.milestone, obj.verified_progress_percentage, obj.source)
+        obj.pk = result.pk
+
+
+@admin.register(SiteVideo)
+class SiteVideoAdmin(admin.ModelAdmin):
+    """
+    Admin view of uploaded site videos and what their processing produced. Videos are uploaded through the API.
+    """
+    list_display = ('id', 'milestone', 'uploaded_by', 'status', 'duration_seconds', 'frames_sampled',
+                    'processing_seconds', 'progress_result', 'created_at')
+    list_select_related = ('milestone', 'uploaded_by', 'progress_result')
+    list_filter = ('status',)
+    search_fields = ('=milestone__id',)
+    readonly_fields = ('milestone', 'uploaded_by', 'video', 'status', 'duration_seconds', 'frames_decoded',
+                       'frames_sampled', 'processing_seconds', 'progress_result', 'error', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """
+    Admin view of undelivered outbox events; delivered events are deleted by the dispatcher.
+    """
+    list_display = ('id', 'event_type', 'payment_id', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('=payment_id',)
+    readonly_fields = ('payment_id', 'event_type', 'payload', 'attempts', 'created_at', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected events for immediate delivery")
+    def requeue(self, request, queryset):
+        updated = queryset.update(status=OutboxEvent.STATUS_PENDING, attempts=0, available_at=timezone.now())
+        self.message_user(request, f"{updated} event(s) requeued.")
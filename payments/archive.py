@@ -0,0 +1,56 @@
+# payments/archive.py
+
+"""
+Hot/cold archival of settled payments.
+
+Completed/Failed payments older than ARCHIVE_SETTLED_AFTER_DAYS are moved, together with
+their transactions, into ArchivedPayment/ArchivedTransaction so the live tables and their
+indexes only hold recent and in-flight rows. Each chunk is copied and deleted in one database
+transaction, and rows are selected by state, so an interrupted run simply resumes where it
+stopped the next time it is started.
+"""
+
+from django.db import transaction
+
+from .models import ArchivedPayment, ArchivedTransaction, Payment, Transaction
+
+SETTLED_STATUSES = ('Completed', 'Failed')
+
+PAYMENT_FIELDS = (
+    'id', 'user_id', 'payment_method', 'payment_date', 'amount', 'status',
+    'paystack_reference', 'paystack_authorization_url', 'milestone_id',
+)
+TRANSACTION_FIELDS = ('id', 'payment_id', 'transaction_date', 'amount', 'status', 'paystack_charge_id')
+
+
+def archivable_payments(cutoff):
+    """
+    Settled payments created before `cutoff`. Served by the (status, payment_date) index.
+    """
+    return Payment.objects.filter(status__in=SETTLED_STATUSES, payment_date__lt=cutoff)
+
+
+def archive_chunk(cutoff, chunk_size):
+    """
+    Move up to `chunk_size` archivable payments and their transactions to the archive tables.
+    Returns (payments moved, transactions moved); (0, 0) means there is nothing left to do.
+    Rows locked by a concurrent request are skipped and picked up by a later run.
+    """
+    with transaction.atomic():
+        payment_rows = list(
+            archivable_payments(cutoff)
+            .select_for_update(skip_locked=True)
+            .order_by('id')
+            .values(*PAYMENT_FIELDS)[:chunk_size]
+        )
+        if not payment_rows:
+            return 0, 0
+        payment_ids = [row['id'] for row in payment_rows]
+        transaction_rows = list(Transaction.objects.filter(payment_id__in=payment_ids).values(*TRANSACTION_FIELDS))
+
+        ArchivedPayment.objects.bulk_create([ArchivedPayment(**row) for row in payment_rows])
+        ArchivedTransaction.objects.bulk_create([ArchivedTransaction(**row) for row in transaction_rows])
+
+        Transaction.objects.filter(payment_id__in=payment_ids).delete()
+        Payment.objects.filter(pk__in=payment_ids).delete()
+        return len(payment_rows), len(transaction_rows)
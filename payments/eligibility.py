@@ -0,0 +1,170 @@
+# payments/eligibility.py
+
+"""
+Incremental progress-to-payment eligibility.
+
+Milestones and projects carry running totals (see RunningTotalsMixin):
+
+    earned    = milestone.amount * verified_progress_percentage / 100
+    paid      = sum of Completed payments
+    committed = sum of in-flight payments (Pending/Approved)
+    releasable = earned - paid - committed
+
+Every progress result and payment status change adjusts those totals by a delta under a
+row lock on the milestone (then the project), so checking whether a payment is allowed is
+a single-row read, however many images, videos and payments a project accumulates.
+`rebuild_totals` recomputes everything from scratch if the totals ever need repairing.
+"""
+
+from collections import defaultdict
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+from .models import ArchivedPayment, Milestone, Payment, ProgressResult, Project
+
+COMMITTED_STATUSES = ('Pending', 'Approved')
+PAID_STATUSES = ('Completed',)
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+class PaymentNotEligible(Exception):
+    """
+    The payment amount exceeds what the milestone's verified progress allows.
+    """
+
+
+def _bucket(status):
+    if status in PAID_STATUSES:
+        return 'paid_amount'
+    if status in COMMITTED_STATUSES:
+        return 'committed_amount'
+    return None # e.g. 'Failed', 'Rejected': no longer counts towards either total
+
+
+def _earned(milestone, percentage):
+    return (milestone.amount * percentage / 100).quantize(CENT, rounding=ROUND_DOWN)
+
+
+def _lock_milestone(milestone_id):
+    return Milestone.objects.select_for_update().get(pk=milestone_id)
+
+
+def _apply_deltas(milestone, **deltas):
+    """
+    Add `deltas` (field -> Decimal) to the locked milestone and, with F() updates, to its project.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    for field, delta in deltas.items():
+        setattr(milestone, field, getattr(milestone, field) + delta)
+    milestone.save(update_fields=list(deltas))
+    Project.objects.filter(pk=milestone.project_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def reserve_payment(payment):
+    """
+    Check a newly created payment against its milestone and count it as committed.
+    Raises PaymentNotEligible (call inside the transaction that created the payment, so it rolls back).
+    """
+    bucket = _bucket(payment.status)
+    if payment.milestone_id is None or bucket is None:
+        return
+    with transaction.atomic():
+        milestone = _lock_milestone(payment.milestone_id)
+        if payment.amount > milestone.releasable_amount:
+            raise PaymentNotEligible(
+                f"Amount {payment.amount} exceeds the releasable amount {milestone.releasable_amount} "
+                f"for milestone {milestone.pk} ({milestone.verified_progress_percentage}% verified)."
+            )
+        _apply_deltas(milestone, **{bucket: payment.amount})
+
+
+def apply_payment_transition(payment, old_status):
+    """
+    Move the payment's amount between the running totals after its status changed from `old_status`.
+    Repeated calls for the same status are no-ops.
+    """
+    apply_payment_change(payment, payment.milestone_id, payment.amount, old_status)
+
+
+def apply_payment_change(payment, old_milestone_id, old_amount, old_status):
+    """
+    Update the running totals after any of the payment's milestone, amount and status changed:
+    the old contribution is taken off the old milestone and the new one added to the current one.
+    A Completed payment can't leave Completed (its progress would become releasable again).
+    """
+    if old_status in PAID_STATUSES and payment.status not in PAID_STATUSES:
+        raise ValueError(f"Payment {payment.pk} is {old_status} and can't become {payment.status}.")
+    deltas = defaultdict(lambda: defaultdict(Decimal)) # milestone id -> field -> delta
+    old_bucket, new_bucket = _bucket(old_status), _bucket(payment.status)
+    if old_milestone_id is not None and old_bucket:
+        deltas[old_milestone_id][old_bucket] -= old_amount
+    if payment.milestone_id is not None and new_bucket:
+        deltas[payment.milestone_id][new_bucket] += payment.amount
+    with transaction.atomic():
+        for milestone_id in sorted(deltas): # same lock order as every other path
+            if any(deltas[milestone_id].values()):
+                _apply_deltas(_lock_milestone(milestone_id), **deltas[milestone_id])
+
+
+def record_progress(milestone, verified_progress_percentage, source=''):
+    """
+    Store an AI-verified progress result and raise the milestone's verified completion if it is higher.
+    Returns the ProgressResult; raises ValueError for a percentage outside 0-100.
+    """
+    percentage = Decimal(str(verified_progress_percentage)).quantize(CENT)
+    if not ZERO <= percentage <= 100:
+        raise ValueError(f"Verified progress must be between 0 and 100, not {verified_progress_percentage}.")
+    with transaction.atomic():
+        result = ProgressResult.objects.create(
+            milestone_id=milestone.pk, verified_progress_percentage=percentage, source=source,
+        )
+        locked = _lock_milestone(milestone.pk)
+        locked.progress_result_count += 1
+        update_fields = ['progress_result_count']
+        if percentage > locked.verified_progress_percentage:
+            earned_delta = _earned(locked, percentage) - locked.earned_amount
+            locked.verified_progress_percentage = percentage
+            update_fields.append('verified_progress_percentage')
+            locked.save(update_fields=update_fields)
+            _apply_deltas(locked, earned_amount=earned_delta)
+        else:
+            locked.save(update_fields=update_fields)
+    return result
+
+
+def rebuild_totals(project):
+    """
+    Recompute every running total of `project` and its milestones from progress results and payments
+    (live and archived). For repairs only; normal operation never needs it.
+    """
+    with transaction.atomic():
+        # Milestones (by id) before the project, like _apply_deltas, so concurrent payments can't deadlock with this.
+        milestones = list(Milestone.objects.select_for_update().filter(project=project).order_by('pk'))
+        Project.objects.select_for_update().get(pk=project.pk)
+        project_totals = dict(earned_amount=ZERO, paid_amount=ZERO, committed_amount=ZERO)
+        for milestone in milestones:
+            progress = milestone.progress_results.aggregate(best=Max('verified_progress_percentage'))['best']
+            milestone.verified_progress_percentage = progress or ZERO
+            milestone.progress_result_count = milestone.progress_results.count()
+            milestone.earned_amount = _earned(milestone, milestone.verified_progress_percentage)
+            milestone.paid_amount = _sum_payments(milestone, PAID_STATUSES)
+            milestone.committed_amount = _sum_payments(milestone, COMMITTED_STATUSES)
+            milestone.save()
+            for field in project_totals:
+                project_totals[field] += getattr(milestone, field)
+        Project.objects.filter(pk=project.pk).update(**project_totals)
+
+
+def _sum_payments(milestone, statuses):
+    total = ZERO
+    for model in (Payment, ArchivedPayment):
+        total += model.objects.filter(milestone=milestone, status__in=statuses).aggregate(total=Sum('amount'))['total'] or ZERO
+    return total
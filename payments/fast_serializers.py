@@ -0,0 +1,130 @@
+# payments/fast_serializers.py
+
+"""
+Read-only fast path for the list endpoints.
+
+Builds plain dicts straight from `.values()` rows instead of instantiating a
+ModelSerializer (and its nested serializers) per object. The output has exactly
+the same shape and value formatting as PaymentSerializer / TransactionSerializer.
+"""
+
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Payment, Transaction
+
+# Columns fetched with .values(); order doesn't matter, the mappers below pick them by name.
+TRANSACTION_VALUES = ('id', 'amount', 'status', 'transaction_date', 'payment_id', 'paystack_charge_id')
+PAYMENT_VALUES = (
+    'id', 'user_id', 'user__username', 'user__email', 'payment_method', 'amount', 'status',
+    'payment_date', 'paystack_reference', 'paystack_authorization_url', 'milestone_id',
+)
+
+
+def _decimal_mapper(model, field_name):
+    """
+    Mirror serializers.DecimalField.to_representation for a model DecimalField.
+    """
+    places = model._meta.get_field(field_name).decimal_places
+    quantum = Decimal(1).scaleb(-places)
+    coerce_to_string = getattr(settings, 'REST_FRAMEWORK', {}).get('COERCE_DECIMAL_TO_STRING', True)
+
+    def to_representation(value):
+        if value is None:
+            return None
+        value = value.quantize(quantum)
+        return '{:f}'.format(value) if coerce_to_string else value
+    return to_representation
+
+
+def _datetime_mapper():
+    """
+    Mirror serializers.DateTimeField.to_representation (ISO-8601, current timezone, 'Z' for UTC).
+    """
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def to_representation(value):
+        if value is None:
+            return None
+        if tz is not None and timezone.is_aware(value):
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return to_representation
+
+
+def _compile_transaction_mapper():
+    amount = _decimal_mapper(Transaction, 'amount')
+    transaction_date = _datetime_mapper()
+
+    def to_representation(row):
+        return {
+            'id': row['id'],
+            'amount': amount(row['amount']),
+            'status': row['status'],
+            'transaction_date': transaction_date(row['transaction_date']),
+            'payment': row['payment_id'],
+            'paystack_charge_id': row['paystack_charge_id'],
+        }
+    return to_representation
+
+
+def _compile_payment_mapper():
+    amount = _decimal_mapper(Payment, 'amount')
+    payment_date = _datetime_mapper()
+
+    def to_representation(row, transactions):
+        return {
+            'id': row['id'],
+            'user': {
+                'id': row['user_id'],
+                'username': row['user__username'],
+                'email': row['user__email'],
+            },
+            'payment_method': row['payment_method'],
+            'amount': amount(row['amount']),
+            'status': row['status'],
+            'payment_date': payment_date(row['payment_date']),
+            'paystack_reference': row['paystack_reference'],
+            'paystack_authorization_url': row['paystack_authorization_url'],
+            'milestone': row['milestone_id'],
+            'transactions': transactions,
+        }
+    return to_representation
+
+
+def iter_transaction_rows(queryset, chunk_size=2000):
+    """
+    Yield TransactionSerializer-shaped dicts for every transaction in `queryset`.
+    """
+    to_representation = _compile_transaction_mapper()
+    for row in queryset.values(*TRANSACTION_VALUES).iterator(chunk_size=chunk_size):
+        yield to_representation(row)
+
+
+def iter_payment_rows(queryset, chunk_size=500):
+    """
+    Yield PaymentSerializer-shaped dicts for every payment in `queryset`.
+
+    Payments are read in chunks; each chunk's transactions are fetched with a single
+    `payment_id__in` query, so the query count is O(rows / chunk_size) and memory stays bounded.
+    Keep `chunk_size` below SQLite's 999 bound-parameter limit.
+    """
+    to_representation = _compile_payment_mapper()
+    transaction_to_representation = _compile_transaction_mapper()
+    rows = queryset.values(*PAYMENT_VALUES).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        transactions = {row['id']: [] for row in chunk}
+        # Transaction.Meta.ordering keeps the nested list in the same order as `payment.transaction_set.all()`.
+        for row in Transaction.objects.filter(payment_id__in=transactions).values(*TRANSACTION_VALUES):
+            transactions[row['payment_id']].append(transaction_to_representation(row))
+        for row in chunk:
+            yield to_representation(row, transactions[row['id']])
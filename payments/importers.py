@@ -0,0 +1,422 @@
+# payments/importers.py
+
+"""
+Bulk import of historical Paystack transactions, used when onboarding a contractor.
+
+Exports are read one record at a time: CSV from the dashboard, or a JSON array / JSON lines
+dumped from the /transaction API. Every Paystack transaction becomes one Payment plus one
+Transaction for the contractor. Records are written in batches: the references and charge IDs
+of the batch that already exist (live or archived) are loaded into sets, in chunks, and skipped,
+so re-importing a file or an overlapping export never creates duplicates. New rows are inserted
+with bulk_create, or with COPY on PostgreSQL.
+
+Each batch is committed on its own and `ImportCheckpoint` records how many records of the file
+are done, so an interrupted import resumes after the last committed batch. Memory use is bounded
+by the batch size, whatever the size of the file.
+
+Imported history is not linked to milestones and records no outbox events.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ArchivedPayment, ArchivedTransaction, Payment, Transaction
+
+CENT = Decimal('0.01')
+MAX_AMOUNT = Decimal('100000000') # Payment.amount / Transaction.amount: max_digits=10, decimal_places=2
+
+# Existing references/charge IDs are looked up this many at a time (bounded IN lists).
+LOOKUP_CHUNK_SIZE = 1000
+
+# A JSON error this close to the end of the buffer may just be a record cut off by the chunk
+# boundary ("tru", "-Infinit", half a \u escape); anywhere else the export is invalid.
+JSON_TRUNCATION_MARGIN = 16
+
+# Export column -> field. CSV headers and JSON keys are lower-cased, with spaces and dashes as underscores.
+FIELD_ALIASES = {
+    'reference': ('reference', 'transaction_reference'),
+    'charge_id': ('id', 'transaction_id'),
+    'amount': ('amount',),
+    'status': ('status',),
+    'channel': ('channel', 'payment_method'),
+    'date': ('paid_at', 'paidat', 'paid_on', 'transaction_date', 'created_at', 'createdat', 'date'),
+}
+
+# Paystack transaction status -> (Payment.status, Transaction.status)
+PAYSTACK_STATUSES = {
+    'success': ('Completed', 'Completed'),
+    'failed': ('Failed', 'Failed'),
+    'abandoned': ('Failed', 'Failed'),
+    'reversed': ('Failed', 'Refunded'),
+    'pending': ('Pending', 'Initiated'),
+    'ongoing': ('Pending', 'Initiated'),
+    'processing': ('Pending', 'Initiated'),
+    'queued': ('Pending', 'Initiated'),
+}
+
+
+class ImportRowError(ValueError):
+    """
+    A record that can't be imported (missing reference, unknown status, bad amount or date).
+    """
+
+
+# --- Reading exports -----------------------------------------------------------------------
+
+def _normalize_key(key):
+    return (key or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def iter_csv_records(stream):
+    """
+    Yield the rows of a CSV export (text stream) as dicts with normalized keys.
+    """
+    reader = csv.reader(stream)
+    header = [_normalize_key(column) for column in next(reader, [])]
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def iter_json_records(stream, chunk_size=64 * 1024):
+    """
+    Yield the objects of a JSON array or of JSON lines (text stream), reading `chunk_size`
+    characters at a time. An API response ({"status": true, "data": [...]}) is also accepted.
+    Raises ValueError at the first invalid or truncated record.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    offset = 0 # characters of the stream before `buffer`
+    in_array = None
+    while True:
+        # Skip whitespace, and the commas between array elements.
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+            pos += 1
+        if pos < len(buffer) and in_array is None:
+            in_array = buffer[pos] == '['
+            pos += in_array
+            continue
+        if in_array and pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("need more data", buffer, pos)
+            obj, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Only a record that runs into the end of the buffer can be completed by reading more.
+            if e.pos < len(buffer) - JSON_TRUNCATION_MARGIN and not e.msg.startswith('Unterminated string'):
+                raise ValueError(f"Invalid JSON at offset {offset + e.pos}: {e.msg}.")
+            more = stream.read(chunk_size)
+            if not more:
+                if pos < len(buffer) or in_array:
+                    raise ValueError(f"Truncated or invalid JSON export at offset {offset + pos}.")
+                return
+            offset += pos
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        items = obj['data'] if isinstance(obj, dict) and isinstance(obj.get('data'), list) else [obj]
+        for item in items:
+            # Anything but an object is reported as an invalid record (no reference).
+            yield {_normalize_key(k): v for k, v in item.items()} if isinstance(item, dict) else {}
+
+
+def iter_records(stream, format):
+    if format == 'csv':
+        return iter_csv_records(stream)
+    if format == 'json':
+        return iter_json_records(stream)
+    raise ValueError(f"Unknown export format {format!r}; expected 'csv' or 'json'.")
+
+
+def guess_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'json'
+
+
+# --- Normalizing ---------------------------------------------------------------------------
+
+def _get(record, field):
+    for key in FIELD_ALIASES[field]:
+        value = record.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _parse_amount(value, in_subunits):
+    try:
+        amount = Decimal(str(value).replace(',', '').strip())
+        if in_subunits:
+            amount /= 100 # kobo/pesewas/cents
+        amount = amount.quantize(CENT)
+    except InvalidOperation: # also NaN/Infinity
+        raise ImportRowError(f"invalid amount {value!r}")
+    if not 0 <= amount < MAX_AMOUNT:
+        raise ImportRowError(f"amount {amount} out of range")
+    return amount
+
+
+def _parse_date(value):
+    value = str(value).strip()
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, dt_time.min) if day else None
+    except ValueError: # well formed but not a valid date
+        parsed = None
+    if parsed is None:
+        raise ImportRowError(f"invalid date {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc) # Paystack exports are in UTC
+    return parsed
+
+
+def normalize_record(record, in_subunits):
+    """
+    Map one export record to the values of the Payment/Transaction pair. Raises ImportRowError.
+    """
+    reference = _get(record, 'reference')
+    if not reference:
+        raise ImportRowError("missing reference")
+    raw_status = str(_get(record, 'status') or '').strip().lower()
+    try:
+        payment_status, transaction_status = PAYSTACK_STATUSES[raw_status]
+    except KeyError:
+        raise ImportRowError(f"unknown status {raw_status!r}")
+    amount = _get(record, 'amount')
+    date = _get(record, 'date')
+    if amount is None or date is None:
+        raise ImportRowError("missing amount or date")
+    reference = str(reference).strip()
+    return {
+        'reference': reference,
+        # The app itself stores the reference as the charge ID; exports carry Paystack's transaction ID.
+        'charge_id': str(_get(record, 'charge_id') or reference).strip(),
+        'amount': _parse_amount(amount, in_subunits),
+        'payment_status': payment_status,
+        'transaction_status': transaction_status,
+        'channel': str(_get(record, 'channel') or 'Paystack').strip()[:255],
+        'date': _parse_date(date),
+    }
+
+
+# --- Checkpoints ---------------------------------------------------------------------------
+
+class ImportCheckpoint:
+    """
+    Number of records of `path` already imported, kept in `<path>.import-state`.
+    Tied to the file's size, so a different file under the same name starts from the top.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state_path = f'{path}.import-state'
+
+    def load(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if state.get('size') != os.path.getsize(self.path):
+            return 0
+        return state.get('records', 0)
+
+    def save(self, records):
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': os.path.getsize(self.path), 'records': records}, f)
+        os.replace(tmp_path, self.state_path) # never leaves a half-written checkpoint
+
+    def clear(self):
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+
+# --- Importing -----------------------------------------------------------------------------
+
+class ImportStats:
+    def __init__(self, records_done=0):
+        self.records = records_done # records consumed from the file, including skipped ones
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = [] # the first few ImportRowErrors, as (record number, message)
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return max(time.monotonic() - self.started, 1e-9)
+
+    @property
+    def imported_per_second(self):
+        return self.imported / self.elapsed
+
+
+class PaystackImporter:
+    """
+    Import export records for `user`. `run` consumes an iterable of records (see `iter_records`).
+    """
+    max_errors_kept = 20
+
+    def __init__(self, user, batch_size=None, in_subunits=True, use_copy=None):
+        self.user = user
+        self.batch_size = batch_size or getattr(settings, 'PAYSTACK_IMPORT_BATCH_SIZE', 5000)
+        self.in_subunits = in_subunits
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+
+    def run(self, records, skip=0, on_batch=None):
+        """
+        Import `records`, ignoring the first `skip` (already imported by an earlier run).
+        `on_batch(stats)` is called after each committed batch, e.g. to save a checkpoint.
+        Returns an ImportStats.
+        """
+        stats = ImportStats(records_done=skip)
+        batch = []
+        for number, record in enumerate(records, start=1):
+            if number <= skip:
+                continue
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, stats)
+                batch = []
+                if on_batch:
+                    on_batch(stats)
+        if batch:
+            self._import_batch(batch, stats)
+            if on_batch:
+                on_batch(stats)
+        return stats
+
+    def _import_batch(self, batch, stats):
+        rows = []
+        for number, record in batch:
+            try:
+                rows.append(normalize_record(record, self.in_subunits))
+            except ImportRowError as e:
+                stats.invalid += 1
+                if len(stats.errors) < self.max_errors_kept:
+                    stats.errors.append((number, str(e)))
+
+        seen_references = _existing_values(
+            (Payment, ArchivedPayment), 'paystack_reference', [row['reference'] for row in rows])
+        seen_charge_ids = _existing_values(
+            (Transaction, ArchivedTransaction), 'paystack_charge_id', [row['charge_id'] for row in rows])
+        new_rows = []
+        for row in rows:
+            if row['reference'] in seen_references or row['charge_id'] in seen_charge_ids:
+                stats.duplicates += 1
+                continue
+            seen_references.add(row['reference']) # duplicates within the batch too
+            seen_charge_ids.add(row['charge_id'])
+            new_rows.append(row)
+
+        with transaction.atomic():
+            if new_rows:
+                if self.use_copy:
+                    self._copy(new_rows)
+                else:
+                    self._bulk_create(new_rows)
+        stats.imported += len(new_rows)
+        stats.records += len(batch)
+
+    def _payment_values(self, row):
+        return {
+            'user_id': self.user.pk,
+            'payment_method': row['channel'],
+            'payment_date': row['date'],
+            'amount': row['amount'],
+            'status': row['payment_status'],
+            'paystack_reference': row['reference'],
+        }
+
+    @staticmethod
+    def _transaction_values(row, payment_id):
+        return {
+            'payment_id': payment_id,
+            'transaction_date': row['date'],
+            'amount': row['amount'],
+            'status': row['transaction_status'],
+            'paystack_charge_id': row['charge_id'],
+        }
+
+    def _bulk_create(self, rows):
+        payments = Payment.objects.bulk_create(
+            [Payment(**self._payment_values(row)) for row in rows], batch_size=self.batch_size)
+        if payments[0].pk is None: # backends that can't return the inserted IDs
+            payment_ids = _payment_ids([row['reference'] for row in rows])
+        else:
+            payment_ids = {payment.paystack_reference: payment.pk for payment in payments}
+        Transaction.objects.bulk_create(
+            [Transaction(**self._transaction_values(row, payment_ids[row['reference']])) for row in rows],
+            batch_size=self.batch_size,
+        )
+
+    def _copy(self, rows):
+        payment_rows = [self._payment_values(row) for row in rows]
+        copy_rows(Payment, list(payment_rows[0]), [list(values.values()) for values in payment_rows])
+        payment_ids = _payment_ids([row['reference'] for row in rows])
+        transaction_rows = [self._transaction_values(row, payment_ids[row['reference']]) for row in rows]
+        copy_rows(Transaction, list(transaction_rows[0]), [list(values.values()) for values in transaction_rows])
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _existing_values(models, field, values):
+    """
+    The subset of `values` already stored in `field` of any of `models`, as a set.
+    """
+    existing = set()
+    for chunk in _chunks(list(set(values))):
+        for model in models:
+            existing.update(model.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+    return existing
+
+
+def _payment_ids(references):
+    payment_ids = {}
+    for chunk in _chunks(references):
+        payment_ids.update(Payment.objects.filter(paystack_reference__in=chunk).values_list('paystack_reference', 'id'))
+    return payment_ids
+
+
+def copy_rows(model, fields, rows):
+    """
+    Load `rows` (lists of values for the `fields` attnames) into `model`'s table with PostgreSQL COPY.
+    Works with psycopg 3 (`cursor.copy`) and psycopg2 (`copy_expert`).
+    """
+    column_names = {field.attname: field.column for field in model._meta.concrete_fields}
+    columns = ', '.join(connection.ops.quote_name(column_names[field]) for field in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy'):
+            with raw_cursor.copy(f'COPY {table} ({columns}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(['' if value is None else _copy_text(value) for value in row])
+            buffer.seek(0)
+            raw_cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _copy_text(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
@@ -0,0 +1,57 @@
+# payments/management/commands/archive_settled_payments.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.archive import archivable_payments, archive_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Move settled (Completed/Failed) payments older than ARCHIVE_SETTLED_AFTER_DAYS, with their "
+        "transactions, into the archive tables. Works in small committed chunks and can be "
+        "interrupted and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            default=getattr(settings, 'ARCHIVE_SETTLED_AFTER_DAYS', 365))
+        parser.add_argument('--chunk-size', type=int, default=getattr(settings, 'ARCHIVE_CHUNK_SIZE', 500),
+                            help="Payments moved per database transaction.")
+        parser.add_argument('--max-chunks', type=int, default=None, help="Stop after this many chunks.")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks, to limit load on the live database.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many payments would move.")
+
+    def handle(self, *args, **options):
+        # Fixed for the whole run, so payments settling while it runs don't keep it going.
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+
+        if options['dry_run']:
+            count = archivable_payments(cutoff).count()
+            self.stdout.write(f"{count} settled payments created before {cutoff:%Y-%m-%d %H:%M} would be archived.")
+            return
+
+        payments_total = transactions_total = chunks = 0
+        start = time.monotonic()
+        while options['max_chunks'] is None or chunks < options['max_chunks']:
+            payments_moved, transactions_moved = archive_chunk(cutoff, options['chunk_size'])
+            if not payments_moved:
+                break
+            chunks += 1
+            payments_total += payments_moved
+            transactions_total += transactions_moved
+            if options['verbosity'] > 1:
+                self.stdout.write(f"chunk {chunks}: {payments_moved} payments, {transactions_moved} transactions")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {payments_total} payments and {transactions_total} transactions in {chunks} chunks "
+            f"({payments_total / elapsed:,.0f} payments/s)."
+        ))
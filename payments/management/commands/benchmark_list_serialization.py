@@ -0,0 +1,84 @@
+# payments/management/commands/benchmark_list_serialization.py
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from payments.fast_serializers import iter_payment_rows, iter_transaction_rows
+from payments.models import Payment, Transaction
+from payments.renderers import iter_json_array
+from payments.serializers import PaymentSerializer, TransactionSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the list endpoints' serialization: PaymentSerializer + JSONRenderer (before) "
+        "against the .values() fast path + orjson (after). Synthetic rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Number of synthetic payments to create.")
+        parser.add_argument('--transactions-per-payment', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=3, help="Best-of-N timing.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username='__benchmark_list_serialization__', email='bench@example.com')
+            payments = Payment.objects.bulk_create(
+                Payment(user=user, payment_method='Card', amount=Decimal('1250.50'), status='Completed',
+                        paystack_reference=f'bench-{i}')
+                for i in range(options['rows'])
+            )
+            Transaction.objects.bulk_create(
+                Transaction(payment=payment, amount=payment.amount, status='Completed', paystack_charge_id=f'bench-{i}')
+                for payment in payments
+                for i in range(options['transactions_per_payment'])
+            )
+
+            payment_qs = Payment.objects.filter(user=user).order_by('-payment_date')
+            transaction_qs = Transaction.objects.filter(payment__user=user).order_by('-transaction_date')
+
+            def payments_before():
+                return JSONRenderer().render(PaymentSerializer(payment_qs, many=True).data)
+
+            def payments_after():
+                return b''.join(iter_json_array(iter_payment_rows(payment_qs)))
+
+            def transactions_before():
+                return JSONRenderer().render(TransactionSerializer(transaction_qs, many=True).data)
+
+            def transactions_after():
+                return b''.join(iter_json_array(iter_transaction_rows(transaction_qs)))
+
+            self._compare('GET /api/payments/', payments_before, payments_after,
+                          payment_qs.count(), options['repeat'])
+            self._compare('GET /api/transactions/', transactions_before, transactions_after,
+                          transaction_qs.count(), options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def _compare(self, label, before, after, rows, repeat):
+        if before() != after():
+            self.stderr.write(self.style.ERROR(f"{label}: fast path output differs from the serializer output"))
+        before_time = self._best_of(before, repeat)
+        after_time = self._best_of(after, repeat)
+        self.stdout.write(
+            f"{label} ({rows} rows): "
+            f"before {rows / before_time:,.0f} rows/s, after {rows / after_time:,.0f} rows/s "
+            f"({before_time / after_time:.1f}x)"
+        )
+
+    @staticmethod
+    def _best_of(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
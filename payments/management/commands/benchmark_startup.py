@@ -0,0 +1,65 @@
+# payments/management/commands/benchmark_startup.py
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: load the WSGI app, then push one request through it.
+# Django imports the URLconf (and everything it pulls in) on the first request, so that is included.
+WORKER_SCRIPT = """
+import json, sys, time
+from io import BytesIO
+
+start = time.perf_counter()
+from construction_payments.wsgi import application
+loaded = time.perf_counter()
+
+statuses = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'HTTP_ACCEPT': 'application/json', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+}
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+served = time.perf_counter()
+
+print(json.dumps({
+    'load': loaded - start,
+    'first_request': served - loaded,
+    'status': statuses[0],
+    'drf_yasg_loaded': 'drf_yasg.views' in sys.modules,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure worker time-to-first-request: WSGI app load plus the first request, in fresh interpreters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/', help="Path of the first request.")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'construction_payments.settings')}
+        results = []
+        for _ in range(options['runs']):
+            output = subprocess.run(
+                [sys.executable, '-c', WORKER_SCRIPT, options['path']],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        load = statistics.median(result['load'] for result in results)
+        first_request = statistics.median(result['first_request'] for result in results)
+        self.stdout.write(
+            f"{options['runs']} runs, GET {options['path']} -> {results[-1]['status']}\n"
+            f"  app load:          {load * 1000:.0f} ms (median)\n"
+            f"  first request:     {first_request * 1000:.0f} ms (median)\n"
+            f"  time-to-first-request: {(load + first_request) * 1000:.0f} ms\n"
+            f"  drf_yasg imported: {results[-1]['drf_yasg_loaded']}"
+        )
@@ -0,0 +1,55 @@
+# payments/management/commands/dispatch_outbox.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.outbox import dispatch_batch, load_sinks
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending outbox events to the sinks in settings.OUTBOX_SINKS. "
+        "Several dispatchers can run side by side; rows are claimed with FOR UPDATE SKIP LOCKED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'OUTBOX_BATCH_SIZE', 500))
+        parser.add_argument('--idle-sleep', type=float, default=1.0,
+                            help="Seconds to wait when there is nothing to deliver (or a batch failed).")
+        parser.add_argument('--stats-interval', type=float, default=10.0,
+                            help="Seconds between throughput reports.")
+        parser.add_argument('--once', action='store_true', help="Drain the due events once, then exit.")
+
+    def handle(self, *args, **options):
+        sinks = load_sinks()
+        delivered_total = failed_total = 0
+        window_start = time.monotonic()
+        window_delivered = 0
+
+        try:
+            while True:
+                delivered, failed = dispatch_batch(sinks, options['batch_size'])
+                delivered_total += delivered
+                failed_total += failed
+                window_delivered += delivered
+
+                elapsed = time.monotonic() - window_start
+                if elapsed >= options['stats_interval']:
+                    self._report(window_delivered, elapsed)
+                    window_start, window_delivered = time.monotonic(), 0
+
+                if not delivered:
+                    if options['once']:
+                        break
+                    time.sleep(options['idle_sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self._report(window_delivered, time.monotonic() - window_start)
+        self.stdout.write(f"Delivered {delivered_total} events, {failed_total} scheduled for retry.")
+
+    def _report(self, delivered, elapsed):
+        if delivered:
+            self.stdout.write(f"{delivered} events in {elapsed:.1f}s ({delivered / elapsed:,.0f} events/s)")
@@ -0,0 +1,17 @@
+# payments/management/commands/generate_openapi_schema.py
+
+from django.core.management.base import BaseCommand
+
+from construction_payments.schema import clear_schema_cache, write_schema_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema (JSON and YAML) into OPENAPI_SCHEMA_DIR. "
+        "Run at build/deploy time so workers serve /swagger.json without walking the API."
+    )
+
+    def handle(self, *args, **options):
+        for path in write_schema_files():
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+        clear_schema_cache()
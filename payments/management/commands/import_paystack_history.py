@@ -0,0 +1,78 @@
+# payments/management/commands/import_paystack_history.py
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.importers import ImportCheckpoint, PaystackImporter, guess_format, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a contractor's historical Paystack transactions from a CSV or JSON export into "
+        "Payment/Transaction. Already-imported references are skipped; an interrupted run resumes "
+        "after the last committed batch when started again with the same file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV export, JSON array or JSON lines file.")
+        parser.add_argument('--user', required=True, help="Username of the contractor the payments belong to.")
+        parser.add_argument('--format', choices=('csv', 'json'), help="Default: from the file extension.")
+        parser.add_argument('--amount-unit', choices=('subunit', 'major'),
+                            help="Whether amounts are in kobo/cents (API dumps) or naira/units (dashboard CSV). "
+                                 "Default: subunit for JSON, major for CSV.")
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'PAYSTACK_IMPORT_BATCH_SIZE', 5000),
+                            help="Records per database transaction.")
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an earlier run.")
+        parser.add_argument('--no-copy', action='store_true', help="Use bulk_create even on PostgreSQL.")
+        parser.add_argument('--stats-interval', type=float, default=5.0, help="Seconds between progress reports.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}.")
+
+        path = options['path']
+        format = options['format'] or guess_format(path)
+        amount_unit = options['amount_unit'] or ('major' if format == 'csv' else 'subunit')
+        importer = PaystackImporter(
+            user, batch_size=options['batch_size'], in_subunits=amount_unit == 'subunit',
+            use_copy=False if options['no_copy'] else None,
+        )
+
+        checkpoint = ImportCheckpoint(path)
+        if options['restart']:
+            checkpoint.clear()
+        skip = checkpoint.load()
+        if skip:
+            self.stdout.write(f"Resuming after record {skip} (use --restart to start over).")
+
+        last_report = time.monotonic()
+
+        def on_batch(stats):
+            nonlocal last_report
+            checkpoint.save(stats.records)
+            if time.monotonic() - last_report >= options['stats_interval']:
+                last_report = time.monotonic()
+                self.stdout.write(
+                    f"{stats.records} records, {stats.imported} imported "
+                    f"({stats.imported_per_second:,.0f} rows/s), {stats.duplicates} duplicates, {stats.invalid} invalid"
+                )
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                stats = importer.run(iter_records(stream, format), skip=skip, on_batch=on_batch)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Import stopped: {e}")
+        checkpoint.clear()
+
+        for number, message in stats.errors:
+            self.stderr.write(f"record {number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.imported} payments with their transactions in {stats.elapsed:.1f}s "
+            f"({stats.imported_per_second:,.0f} rows/s, {'COPY' if importer.use_copy else 'bulk_create'}); "
+            f"skipped {stats.duplicates} duplicates and {stats.invalid} invalid records."
+        ))
@@ -0,0 +1,39 @@
+# payments/management/commands/process_site_videos.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.site_videos import process_next_video
+
+
+class Command(BaseCommand):
+    help = (
+        "Sample and analyze uploaded site videos and record their progress against the milestones. "
+        "Several workers can run side by side; videos are claimed with FOR UPDATE SKIP LOCKED. "
+        "Each worker analyzes frames in its own pool of VIDEO_ANALYSIS_WORKERS processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-sleep', type=float, default=2.0,
+                            help="Seconds to wait when no video is pending.")
+        parser.add_argument('--once', action='store_true', help="Process the pending videos once, then exit.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        try:
+            while True:
+                video = process_next_video()
+                if video is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['idle_sleep'])
+                    continue
+                processed += 1
+                if options['verbosity'] > 1 or video.status == video.STATUS_FAILED:
+                    self.stdout.write(f"Video {video.pk}: {video.status} in {video.processing_seconds or 0:.1f}s"
+                                      + (f" ({video.error})" if video.error else ""))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(f"Processed {processed} videos.")
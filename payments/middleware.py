@@ -0,0 +1,56 @@
+# payments/middleware.py
+
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it everything is served gzip-compressed
+    brotli = None
+
+
+_BR_RE = re.compile(r'\bbr\b')
+
+
+def _brotli_sequence(sequence):
+    """
+    Compress an iterable of byte chunks, flushing after each chunk so streamed responses reach the client progressively.
+    """
+    compressor = brotli.Compressor(quality=4)  # low quality keeps CPU cost close to gzip level 6
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that serves the streamed JSON list responses with Brotli when the client accepts it
+    and the `brotli` package is installed. Everything else (HTML pages with CSRF tokens included) keeps
+    GZipMiddleware's gzip with its random-length padding against BREACH.
+    """
+
+    def process_response(self, request, response):
+        if brotli is None or not response.streaming or response.is_async:
+            return super().process_response(request, response)
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return super().process_response(request, response)
+        if not _BR_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response.streaming_content = _brotli_sequence(response.streaming_content)
+        del response.headers['Content-Length']
+
+        # The compressed body is a different representation, so a strong ETag must become weak.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_paystack_authorization_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Automatically set to the date and time of payment creation'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='paystack_charge_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Paystack Transaction ID associated with this transaction.', max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Automatically set to the date and time of transaction creation'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-payment_date'], name='payment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', '-transaction_date'], name='transaction_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:27
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_alter_payment_payment_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_id', models.BigIntegerField(help_text='Payment this event is about; events are delivered in order per payment.')),
+                ('event_type', models.CharField(help_text="e.g., 'payment.created', 'payment.completed'", max_length=100)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('dead', 'Dead (gave up after max attempts)')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not delivered before this time (retry backoff).')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox event',
+                'verbose_name_plural': 'Outbox events',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['available_at', 'id'], name='outbox_pending_due_idx'), models.Index(condition=models.Q(('status', 'pending')), fields=['payment_id', 'id'], name='outbox_pending_payment_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID the payment had in the live table', primary_key=True, serialize=False)),
+                ('payment_method', models.CharField(max_length=255)),
+                ('payment_date', models.DateTimeField(db_index=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=255)),
+                ('paystack_reference', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('paystack_authorization_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived payment',
+                'verbose_name_plural': 'Archived payments',
+                'ordering': ['-payment_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID the transaction had in the live table', primary_key=True, serialize=False)),
+                ('transaction_date', models.DateTimeField(db_index=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=255)),
+                ('paystack_charge_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='payments.archivedpayment')),
+            ],
+            options={
+                'verbose_name': 'Archived transaction',
+                'verbose_name_plural': 'Archived transactions',
+                'ordering': ['-transaction_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpayment',
+            index=models.Index(fields=['user', '-payment_date'], name='archived_payment_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedpayment',
+            index=models.Index(fields=['status', '-payment_date'], name='archived_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['status', '-transaction_date'], name='archived_txn_status_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:29
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_archivedpayment_archivedtransaction_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Milestone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Value of AI-verified progress', max_digits=12)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Sum of Completed payments', max_digits=12)),
+                ('committed_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text="Sum of payments still in flight (e.g. 'Pending')", max_digits=12)),
+                ('name', models.CharField(max_length=255)),
+                ('order', models.PositiveIntegerField(default=0, help_text='Position of the milestone within the project')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Total value of this milestone', max_digits=12)),
+                ('verified_progress_percentage', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Highest AI-verified completion so far (0-100)', max_digits=5)),
+                ('progress_result_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'verbose_name': 'Milestone',
+                'verbose_name_plural': 'Milestones',
+                'ordering': ['project', 'order', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='milestone',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_payments', to='payments.milestone'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='milestone',
+            field=models.ForeignKey(blank=True, help_text='Milestone this payment is requested against; checked against its releasable amount.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='payments.milestone'),
+        ),
+        migrations.CreateModel(
+            name='ProgressResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verified_progress_percentage', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0')), django.core.validators.MaxValueValidator(Decimal('100'))])),
+                ('source', models.CharField(blank=True, help_text="e.g., 'image', 'video'", max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('milestone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_results', to='payments.milestone')),
+            ],
+            options={
+                'verbose_name': 'Progress result',
+                'verbose_name_plural': 'Progress results',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earned_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Value of AI-verified progress', max_digits=12)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Sum of Completed payments', max_digits=12)),
+                ('committed_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text="Sum of payments still in flight (e.g. 'Pending')", max_digits=12)),
+                ('name', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='projects', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Project',
+                'verbose_name_plural': 'Projects',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='milestone',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='milestones', to='payments.project'),
+        ),
+    ]
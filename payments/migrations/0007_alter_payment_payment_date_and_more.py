@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_milestone_archivedpayment_milestone_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='Set to the date and time of payment creation (the original date for imported history)'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='Set to the date and time of transaction creation (the original date for imported history)'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_alter_payment_payment_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteVideo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video', models.FileField(upload_to='site_videos/%Y/%m/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('frames_decoded', models.PositiveIntegerField(default=0)),
+                ('frames_sampled', models.PositiveIntegerField(default=0, help_text='Frames sent to the progress analyzer')),
+                ('processing_seconds', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('milestone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='videos', to='payments.milestone')),
+                ('progress_result', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='video', to='payments.progressresult')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='site_videos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Site video',
+                'verbose_name_plural': 'Site videos',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
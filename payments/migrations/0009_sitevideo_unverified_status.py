@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_sitevideo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sitevideo',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('unverified', 'Unverified (analyzer does not verify progress; nothing recorded)'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
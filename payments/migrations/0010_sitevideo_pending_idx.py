@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_sitevideo_unverified_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sitevideo',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='site_video_pending_idx'),
+        ),
+    ]
@@ -1,10 +1,138 @@
 # payments/models.py
 
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 
 User = get_user_model() # Get the currently active User model
 
+class RunningTotalsMixin(models.Model):
+    """
+    Denormalized running totals kept up to date by payments/eligibility.py, so eligibility
+    checks never re-aggregate progress results or payments.
+    """
+    earned_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+                                        help_text="Value of AI-verified progress")
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+                                      help_text="Sum of Completed payments")
+    committed_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+                                           help_text="Sum of payments still in flight (e.g. 'Pending')")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def releasable_amount(self):
+        """
+        Amount that can still be requested: verified progress not yet paid or reserved by an in-flight payment.
+        """
+        return max(self.earned_amount - self.paid_amount - self.committed_amount, Decimal('0.00'))
+
+class Project(RunningTotalsMixin):
+    """
+    A construction project. Payments are requested against its milestones.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Project"
+        verbose_name_plural = "Projects"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Project {self.id}: {self.name}"
+
+class Milestone(RunningTotalsMixin):
+    """
+    A payable stage of a project. Its `amount` becomes releasable in proportion to
+    the AI-verified progress percentage.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='milestones')
+    name = models.CharField(max_length=255)
+    order = models.PositiveIntegerField(default=0, help_text="Position of the milestone within the project")
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Total value of this milestone")
+    verified_progress_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('0.00'),
+                                                       editable=False,
+                                                       help_text="Highest AI-verified completion so far (0-100)")
+    progress_result_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name = "Milestone"
+        verbose_name_plural = "Milestones"
+        ordering = ['project', 'order', 'id']
+
+    def __str__(self):
+        return f"Milestone {self.id}: {self.name} ({self.verified_progress_percentage}%)"
+
+class ProgressResult(models.Model):
+    """
+    One AI-verified progress observation for a milestone (e.g. the analysis of a site image or video).
+    Create these through eligibility.record_progress() so the milestone totals stay in sync.
+    """
+    milestone = models.ForeignKey(Milestone, on_delete=models.CASCADE, related_name='progress_results')
+    verified_progress_percentage = models.DecimalField(
+        max_digits=5, decimal_places=2,
+        validators=[MinValueValidator(Decimal('0')), MaxValueValidator(Decimal('100'))],
+    )
+    source = models.CharField(max_length=255, blank=True, help_text="e.g., 'image', 'video'")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Progress result"
+        verbose_name_plural = "Progress results"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Progress {self.verified_progress_percentage}% for Milestone {self.milestone_id}"
+
+class SiteVideo(models.Model):
+    """
+    A site walkthrough video uploaded for a milestone. Sampled frames (keyframes and scene changes)
+    are analyzed and aggregated into one ProgressResult with source 'video' by `manage.py
+    process_site_videos` (see payments/site_videos.py and payments/video.py).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSED = 'processed'
+    STATUS_UNVERIFIED = 'unverified'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_UNVERIFIED, 'Unverified (analyzer does not verify progress; nothing recorded)'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    milestone = models.ForeignKey(Milestone, on_delete=models.CASCADE, related_name='videos')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='site_videos')
+    video = models.FileField(upload_to='site_videos/%Y/%m/')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    duration_seconds = models.FloatField(blank=True, null=True)
+    frames_decoded = models.PositiveIntegerField(default=0)
+    frames_sampled = models.PositiveIntegerField(default=0, help_text="Frames sent to the progress analyzer")
+    processing_seconds = models.FloatField(blank=True, null=True)
+    progress_result = models.OneToOneField(ProgressResult, on_delete=models.SET_NULL, blank=True, null=True,
+                                           related_name='video')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Site video"
+        verbose_name_plural = "Site videos"
+        ordering = ['-created_at']
+        indexes = [
+            # process_site_videos claim query: oldest pending video
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='site_video_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Video {self.id} for Milestone {self.milestone_id} ({self.status})"
+
 class Payment(models.Model):
     """
     Represents a payment record within the system.
@@ -12,10 +140,12 @@ class Payment(models.Model):
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     payment_method = models.CharField(max_length=255, help_text="e.g., 'Credit Card', 'Bank Transfer', 'PayPal'")
-    payment_date = models.DateTimeField(auto_now_add=True, help_text="Automatically set to the date and time of payment creation")
+    payment_date = models.DateTimeField(default=timezone.now, editable=False, db_index=True,
+                                        help_text="Set to the date and time of payment creation (the original date for imported history)")
     amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Amount of the payment")
     status = models.CharField(max_length=255, help_text="e.g., 'Pending', 'Approved', 'Rejected', 'Completed'")
-    # Add fields for construction context later, e.g., project_id, milestone_id, verified_progress_percentage
+    milestone = models.ForeignKey(Milestone, on_delete=models.PROTECT, blank=True, null=True, related_name='payments',
+                                  help_text="Milestone this payment is requested against; checked against its releasable amount.")
 
     # --- NEW PAYSTACK-RELATED FIELDS ---
     paystack_reference = models.CharField(max_length=255, blank=True, null=True, unique=True,
@@ -28,6 +158,10 @@ class Payment(models.Model):
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
         ordering = ['-payment_date']
+        indexes = [
+            # Status-filtered listings in date order (admin changelist, settlement queries)
+            models.Index(fields=['status', '-payment_date'], name='payment_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Payment {self.id} by {self.user.username} - {self.amount}"
@@ -38,16 +172,108 @@ class Transaction(models.Model):
     A single payment might involve multiple internal transactions (e.g., authorization, capture).
     """
     payment = models.ForeignKey(Payment, on_delete=models.CASCADE, help_text="The payment this transaction belongs to")
-    transaction_date = models.DateTimeField(auto_now_add=True, help_text="Automatically set to the date and time of transaction creation")
+    transaction_date = models.DateTimeField(default=timezone.now, editable=False, db_index=True,
+                                            help_text="Set to the date and time of transaction creation (the original date for imported history)")
     amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Amount of this specific transaction")
     status = models.CharField(max_length=255, help_text="e.g., 'Initiated', 'Processed', 'Failed', 'Refunded'")
-    paystack_charge_id = models.CharField(max_length=255, blank=True, null=True,
+    paystack_charge_id = models.CharField(max_length=255, blank=True, null=True, db_index=True,
                                           help_text="Paystack Transaction ID associated with this transaction.")
 
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
         ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['status', '-transaction_date'], name='transaction_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Transaction {self.id} for Payment {self.payment.id} - {self.status}"
+
+
+class ArchivedPayment(models.Model):
+    """
+    A settled (Completed/Failed) payment moved out of the live `Payment` table by
+    `python manage.py archive_settled_payments`. Keeps the original ID. Read-only.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="ID the payment had in the live table")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    payment_method = models.CharField(max_length=255)
+    payment_date = models.DateTimeField(db_index=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=255)
+    paystack_reference = models.CharField(max_length=255, blank=True, null=True, unique=True)
+    paystack_authorization_url = models.URLField(max_length=500, blank=True, null=True)
+    milestone = models.ForeignKey(Milestone, on_delete=models.PROTECT, blank=True, null=True, related_name='archived_payments')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived payment"
+        verbose_name_plural = "Archived payments"
+        ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['user', '-payment_date'], name='archived_payment_user_date_idx'),
+            models.Index(fields=['status', '-payment_date'], name='archived_payment_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived payment {self.id} by {self.user.username} - {self.amount}"
+
+class ArchivedTransaction(models.Model):
+    """
+    A transaction archived together with its payment. Keeps the original ID. Read-only.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="ID the transaction had in the live table")
+    payment = models.ForeignKey(ArchivedPayment, on_delete=models.CASCADE, related_name='transactions')
+    transaction_date = models.DateTimeField(db_index=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=255)
+    paystack_charge_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived transaction"
+        verbose_name_plural = "Archived transactions"
+        ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['status', '-transaction_date'], name='archived_txn_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived transaction {self.id} for Payment {self.payment_id} - {self.status}"
+
+class OutboxEvent(models.Model):
+    """
+    A downstream notification (accounting, notifications, ...) written in the same database
+    transaction as the Payment/Transaction change it describes. Pending events are delivered
+    in batches by `python manage.py dispatch_outbox` and deleted once every sink has accepted them.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DEAD, 'Dead (gave up after max attempts)'),
+    ]
+
+    # Not a ForeignKey: events must outlive (and not lock) the payment rows they describe.
+    payment_id = models.BigIntegerField(help_text="Payment this event is about; events are delivered in order per payment.")
+    event_type = models.CharField(max_length=100, help_text="e.g., 'payment.created', 'payment.completed'")
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not delivered before this time (retry backoff).")
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Outbox event"
+        verbose_name_plural = "Outbox events"
+        ordering = ['id']
+        indexes = [
+            # Dispatcher claim query: next due pending events, and "earlier pending event for this payment?" checks
+            models.Index(fields=['available_at', 'id'], condition=models.Q(status='pending'), name='outbox_pending_due_idx'),
+            models.Index(fields=['payment_id', 'id'], condition=models.Q(status='pending'), name='outbox_pending_payment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for Payment {self.payment_id} ({self.status})"
@@ -0,0 +1,215 @@
+# payments/outbox.py
+
+"""
+Transactional outbox for downstream systems (accounting, notifications).
+
+Views call `record_payment_event` / `record_transaction_event` inside the same
+`transaction.atomic()` block as the change itself, so an event exists if and only if
+the change was committed. `dispatch_batch` (run by `manage.py dispatch_outbox`) claims
+due events with SELECT ... FOR UPDATE SKIP LOCKED, hands them to every configured sink
+in one call, and deletes them once delivered. Delivery is at-least-once.
+
+Ordering: an event is only claimed when no earlier event for the same payment is still
+pending, so events for one payment reach the sinks in the order they were recorded,
+even with several dispatchers running. Failed batches are retried with exponential backoff.
+"""
+
+import json
+import logging
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+# --- Recording -----------------------------------------------------------------------------
+
+def payment_payload(payment):
+    return {
+        'id': payment.pk,
+        'user_id': payment.user_id,
+        'payment_method': payment.payment_method,
+        'amount': payment.amount,
+        'status': payment.status,
+        'payment_date': payment.payment_date,
+        'paystack_reference': payment.paystack_reference,
+        'milestone_id': payment.milestone_id,
+    }
+
+
+def transaction_payload(transaction):
+    return {
+        'id': transaction.pk,
+        'payment_id': transaction.payment_id,
+        'amount': transaction.amount,
+        'status': transaction.status,
+        'transaction_date': transaction.transaction_date,
+        'paystack_charge_id': transaction.paystack_charge_id,
+    }
+
+
+def record_event(event_type, payment_id, payload):
+    """
+    Add an event to the outbox. Call this inside the transaction that makes the change.
+    """
+    return OutboxEvent.objects.create(event_type=event_type, payment_id=payment_id, payload=payload)
+
+
+def record_payment_event(payment, event_type):
+    return record_event(event_type, payment.pk, payment_payload(payment))
+
+
+def record_transaction_event(transaction, event_type):
+    return record_event(event_type, transaction.payment_id, transaction_payload(transaction))
+
+
+# --- Sinks ---------------------------------------------------------------------------------
+
+def event_message(event):
+    """
+    The JSON-serializable envelope every sink receives for an event.
+    """
+    return {
+        'id': event.pk,
+        'type': event.event_type,
+        'payment_id': event.payment_id,
+        'created_at': event.created_at,
+        'payload': event.payload,
+    }
+
+
+class BaseSink:
+    """
+    A destination for outbox events. `deliver` gets a whole batch of messages (see `event_message`)
+    and must raise if the batch wasn't accepted; the batch is then retried later.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    def deliver(self, messages):
+        raise NotImplementedError
+
+
+class LogSink(BaseSink):
+    """
+    Writes each event to the `payments.outbox` logger. Useful in development.
+    """
+
+    def deliver(self, messages):
+        for message in messages:
+            logger.info("outbox event %s %s payment=%s", message['id'], message['type'], message['payment_id'])
+
+
+class FileSink(BaseSink):
+    """
+    Appends events as JSON lines to `PATH`, one write per batch.
+    """
+
+    def __init__(self, PATH, **options):
+        super().__init__(**options)
+        self.path = PATH
+
+    def deliver(self, messages):
+        lines = ''.join(json.dumps(message, cls=DjangoJSONEncoder) + '\n' for message in messages)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class HTTPSink(BaseSink):
+    """
+    POSTs each batch as a JSON array to `URL`. Any non-2xx response fails the batch.
+    In development, point it at the stub receiver: /api/outbox-stub/ (mounted when DEBUG is on).
+    """
+
+    def __init__(self, URL, TIMEOUT=5, HEADERS=None, **options):
+        super().__init__(**options)
+        self.url = URL
+        self.timeout = TIMEOUT
+        self.session = requests.Session() # keep-alive across batches
+        self.session.headers.update({'Content-Type': 'application/json', **(HEADERS or {})})
+
+    def deliver(self, messages):
+        response = self.session.post(self.url, data=json.dumps(messages, cls=DjangoJSONEncoder), timeout=self.timeout)
+        response.raise_for_status()
+
+
+def load_sinks(config=None):
+    """
+    Instantiate the sinks from `config` (default: settings.OUTBOX_SINKS), a list of
+    {'BACKEND': 'dotted.path.Sink', 'OPTIONS': {...}} dicts.
+    """
+    if config is None:
+        config = getattr(settings, 'OUTBOX_SINKS', [{'BACKEND': 'payments.outbox.LogSink'}])
+    return [import_string(sink['BACKEND'])(**sink.get('OPTIONS', {})) for sink in config]
+
+
+# --- Dispatching ---------------------------------------------------------------------------
+
+def claimable_events(now=None):
+    """
+    Due, pending events that have no earlier pending event for the same payment.
+    """
+    now = now or timezone.now()
+    earlier_pending = OutboxEvent.objects.filter(
+        status=OutboxEvent.STATUS_PENDING,
+        payment_id=OuterRef('payment_id'),
+        id__lt=OuterRef('id'),
+    )
+    return OutboxEvent.objects.filter(
+        status=OutboxEvent.STATUS_PENDING,
+        available_at__lte=now,
+    ).filter(~Exists(earlier_pending)).order_by('id')
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_BACKOFF_BASE_SECONDS', 2)
+    cap = getattr(settings, 'OUTBOX_BACKOFF_MAX_SECONDS', 600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def dispatch_batch(sinks, batch_size=None):
+    """
+    Claim up to `batch_size` events, deliver them to every sink and delete them.
+    Returns (delivered, failed). Rows stay locked until the batch is settled, so concurrent
+    dispatchers skip them; if this process dies mid-batch the events are simply claimed again.
+    """
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 500)
+    with transaction.atomic():
+        events = list(claimable_events().select_for_update(skip_locked=True)[:batch_size])
+        if not events:
+            return 0, 0
+
+        messages = [event_message(event) for event in events]
+        try:
+            for sink in sinks:
+                sink.deliver(messages)
+        except Exception as e:
+            logger.warning("Outbox delivery of %d events failed: %s", len(events), e)
+            _schedule_retry(events, e)
+            return 0, len(events)
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+        return len(events), 0
+
+
+def _schedule_retry(events, error):
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+    now = timezone.now()
+    for event in events:
+        event.attempts += 1
+        event.last_error = str(error)[:2000]
+        event.available_at = now + retry_delay(event.attempts)
+        if event.attempts >= max_attempts:
+            # Parked for inspection in the admin; later events for the payment are no longer held back.
+            event.status = OutboxEvent.STATUS_DEAD
+    OutboxEvent.objects.bulk_update(events, ['attempts', 'last_error', 'available_at', 'status'])
@@ -0,0 +1,57 @@
+# payments/paginators.py
+
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Return the PostgreSQL planner's row estimate for `queryset`, or None when no estimate is available
+    (other databases, or a table that has never been ANALYZEd).
+
+    Unfiltered querysets read `pg_class.reltuples` (catalog statistics, no table access);
+    filtered ones use the top-level row estimate from `EXPLAIN`.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):  # depends on the driver's json adapter
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    # reltuples is -1 (PostgreSQL 14+) or 0 for tables that were never vacuumed/analyzed
+    return int(estimate) if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that doesn't run COUNT(*) over large tables.
+
+    When the planner estimates at least `exact_count_threshold` rows, that estimate is used as the
+    count; smaller results, and databases without an estimate, fall back to an exact COUNT(*).
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list) if isinstance(self.object_list, QuerySet) else None
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
@@ -0,0 +1,67 @@
+# payments/renderers.py
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to DRF's stdlib-based renderer
+    orjson = None
+
+
+_DRF_ENCODER = encoders.JSONEncoder()
+# Let datetimes go through DRF's encoder so rendered values match JSONRenderer exactly
+# (DRF trims microseconds to milliseconds and uses 'Z' for UTC).
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def orjson_dumps(data):
+    """
+    Serialize `data` to compact UTF-8 JSON bytes, using orjson when it is installed.
+    Output is byte-for-byte compatible with DRF's JSONRenderer (compact, unicode, U+2028/U+2029 escaped).
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    ret = orjson.dumps(data, default=_DRF_ENCODER.default, option=_ORJSON_OPTIONS)
+    # Same JS-compatibility escaping DRF applies, see JSONRenderer.render()
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer that encodes with orjson.
+    Indented output (e.g. `Accept: application/json; indent=4`) is delegated to the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson_dumps(data)
+
+
+def iter_json_array(rows, chunk_size=64 * 1024):
+    """
+    Yield a JSON array as byte chunks of roughly `chunk_size`, for use as StreamingHttpResponse content.
+    Rows are buffered into chunks because GZipMiddleware flushes the compressor once per chunk.
+    """
+    buffer = [b'[']
+    buffered = 1
+    first = True
+    for row in rows:
+        encoded = orjson_dumps(row)
+        if first:
+            first = False
+        else:
+            buffer.append(b',')
+        buffer.append(encoded)
+        buffered += len(encoded) + 1
+        if buffered >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    buffer.append(b']')
+    yield b''.join(buffer)
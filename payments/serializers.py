@@ -1,7 +1,10 @@
 # payments/serializers.py
 
+from django.conf import settings
+from django.core.validators import FileExtensionValidator
+from django.template.defaultfilters import filesizeformat
 from rest_framework import serializers
-from .models import Payment, Transaction
+from .models import ArchivedPayment, ArchivedTransaction, Milestone, Payment, Project, SiteVideo, Transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -71,6 +74,7 @@ class PaymentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'payment_method', 'amount', 'status', 'payment_date',
             'paystack_reference', 'paystack_authorization_url', # <--- ADD NEW PAYSTACK FIELDS
+            'milestone',
             'transactions'
         ]
         read_only_fields = [
@@ -79,3 +83,108 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
     # No custom create method needed here unless you want to handle nested creation directly in serializer
     # The view's perform_create will handle setting 'user' and 'status'.
+
+    def validate_milestone(self, milestone):
+        """
+        Payments can only be requested against milestones of the user's own projects.
+        """
+        request = self.context.get('request')
+        if milestone is not None and request is not None and milestone.project.owner_id != request.user.id:
+            raise serializers.ValidationError("Milestone not found.")
+        return milestone
+
+
+class ArchivedTransactionSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for archived transactions; same fields as TransactionSerializer plus `archived_at`.
+    """
+    class Meta:
+        model = ArchivedTransaction
+        fields = ['id', 'amount', 'status', 'transaction_date', 'payment', 'paystack_charge_id', 'archived_at']
+        read_only_fields = fields
+
+
+class ArchivedPaymentSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for archived payments; same shape as PaymentSerializer plus `archived_at`.
+    """
+    user = UserSerializer(read_only=True)
+    transactions = ArchivedTransactionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedPayment
+        fields = [
+            'id', 'user', 'payment_method', 'amount', 'status', 'payment_date',
+            'paystack_reference', 'paystack_authorization_url', 'milestone',
+            'transactions', 'archived_at'
+        ]
+        read_only_fields = fields
+
+
+class MilestoneSerializer(serializers.ModelSerializer):
+    """
+    Serializer for project milestones. Progress and running totals are maintained by the
+    eligibility engine and are read-only.
+    """
+    releasable_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Milestone
+        fields = [
+            'id', 'project', 'name', 'order', 'amount',
+            'verified_progress_percentage', 'progress_result_count',
+            'earned_amount', 'paid_amount', 'committed_amount', 'releasable_amount',
+        ]
+        read_only_fields = ['project', 'verified_progress_percentage', 'progress_result_count',
+                            'earned_amount', 'paid_amount', 'committed_amount']
+
+
+class ProjectSerializer(serializers.ModelSerializer):
+    """
+    Serializer for projects, with their milestones and project-wide running totals.
+    """
+    milestones = MilestoneSerializer(many=True, read_only=True)
+    releasable_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'name', 'created_at',
+            'earned_amount', 'paid_amount', 'committed_amount', 'releasable_amount',
+            'milestones',
+        ]
+        read_only_fields = ['created_at', 'earned_amount', 'paid_amount', 'committed_amount']
+
+
+SITE_VIDEO_EXTENSIONS = ('mp4', 'm4v', 'mov', 'webm', 'mkv', 'avi')
+
+
+class SiteVideoSerializer(serializers.ModelSerializer):
+    """
+    Serializer for site videos: the upload, its processing statistics and the aggregated progress.
+    Only video files (by extension and content type) up to VIDEO_UPLOAD_MAX_BYTES are accepted.
+    """
+    verified_progress_percentage = serializers.DecimalField(
+        source='progress_result.verified_progress_percentage', max_digits=5, decimal_places=2,
+        read_only=True, allow_null=True,
+    )
+
+    class Meta:
+        model = SiteVideo
+        fields = [
+            'id', 'milestone', 'video', 'status', 'verified_progress_percentage', 'progress_result',
+            'duration_seconds', 'frames_decoded', 'frames_sampled', 'processing_seconds', 'error', 'created_at',
+        ]
+        read_only_fields = [
+            'milestone', 'status', 'progress_result', 'duration_seconds', 'frames_decoded',
+            'frames_sampled', 'processing_seconds', 'error', 'created_at',
+        ]
+        extra_kwargs = {'video': {'validators': [FileExtensionValidator(SITE_VIDEO_EXTENSIONS)]}}
+
+    def validate_video(self, video):
+        max_bytes = getattr(settings, 'VIDEO_UPLOAD_MAX_BYTES', 1024 ** 3)
+        if video.size > max_bytes:
+            raise serializers.ValidationError(f"The video is larger than {filesizeformat(max_bytes)}.")
+        if not (getattr(video, 'content_type', None) or '').startswith('video/'):
+            raise serializers.ValidationError("The file is not a video.")
+        return video
@@ -0,0 +1,70 @@
+# payments/site_videos.py
+
+"""
+Out-of-band processing of uploaded site videos.
+
+The upload API only stores the file and answers 202 with the video 'pending'.
+`process_next_video` (run by `manage.py process_site_videos`) claims the oldest pending video
+with SELECT ... FOR UPDATE SKIP LOCKED, samples and analyzes it (payments/video.py) and records
+the aggregated progress in the same transaction. Several workers can run side by side; if one
+dies mid-video the row lock is released and the video is simply claimed again.
+"""
+
+import logging
+import time
+
+from django.db import transaction
+
+from .eligibility import record_progress
+from .models import SiteVideo
+from .video import VideoProcessingError, analyze_video
+
+logger = logging.getLogger(__name__)
+
+
+def process_site_video(video):
+    """
+    Sample and analyze an uploaded site video and record the aggregated progress against its
+    milestone as one ProgressResult. Problems mark the video 'failed' instead of raising; results of
+    an analyzer that doesn't verify progress (the simulated one) mark it 'unverified' and record nothing.
+    """
+    start = time.monotonic()
+    try:
+        analysis = analyze_video(video.video.path)
+    except VideoProcessingError as e:
+        logger.warning("Site video %s could not be processed: %s", video.pk, e)
+        video.status, video.error = SiteVideo.STATUS_FAILED, str(e)
+    else:
+        video.duration_seconds = analysis.duration_seconds
+        video.frames_decoded = analysis.frames_decoded
+        video.frames_sampled = analysis.frames_sampled
+        if analysis.progress_percentage is None:
+            video.status, video.error = SiteVideo.STATUS_FAILED, "No frame of the video could be analyzed."
+        elif not analysis.verified:
+            video.status = SiteVideo.STATUS_UNVERIFIED
+        else:
+            video.progress_result = record_progress(video.milestone, analysis.progress_percentage, source='video')
+            video.status = SiteVideo.STATUS_PROCESSED
+    video.processing_seconds = time.monotonic() - start
+    video.save()
+    return video
+
+
+def process_next_video():
+    """
+    Claim the oldest pending video and process it. Returns the video, or None if none is pending.
+    An unexpected error marks the video 'failed', so one bad file can't block the queue.
+    """
+    with transaction.atomic():
+        video = (SiteVideo.objects.select_for_update(skip_locked=True)
+                 .filter(status=SiteVideo.STATUS_PENDING).select_related('milestone').order_by('id').first())
+        if video is None:
+            return None
+        try:
+            with transaction.atomic():
+                return process_site_video(video)
+        except Exception as e:
+            logger.exception("Site video %s could not be processed", video.pk)
+            video.status, video.error = SiteVideo.STATUS_FAILED, f"Processing failed: {e}"
+            video.save(update_fields=['status', 'error'])
+            return video
@@ -0,0 +1,95 @@
+# payments/templatetags/payments_admin.py
+
+import datetime
+
+from django import template
+from django.contrib.admin.utils import get_fields_from_path
+from django.db import models
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def index_date_hierarchy(cl):
+    """
+    Same output as admin's {% date_hierarchy %}, but the year/month/day choices are built from
+    MIN/MAX of the date field (two index lookups) instead of SELECT DISTINCT over every matching row.
+    Periods between the first and last row are listed even if they happen to be empty.
+    """
+    field_name = cl.date_hierarchy
+    field = get_fields_from_path(cl.model, field_name)[-1]
+    year_field = '%s__year' % field_name
+    month_field = '%s__month' % field_name
+    day_field = '%s__day' % field_name
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, ['%s__' % field_name])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year_lookup, month_field: month_lookup}),
+                'title': capfirst(formats.date_format(day, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))}],
+        }
+
+    # cl.queryset already carries the selected year/month lookups.
+    bounds = cl.queryset.aggregate(first=models.Min(field_name), last=models.Max(field_name))
+    first, last = bounds['first'], bounds['last']
+    if first is None or last is None:
+        return {'show': True, 'back': None, 'choices': []}
+    if isinstance(field, models.DateTimeField):
+        first, last = (timezone.localtime(value) if timezone.is_aware(value) else value for value in (first, last))
+
+    if not (year_lookup or month_lookup):
+        # Start at the narrowest level that has more than one choice, like the stock tag.
+        if first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        year, month = int(year_lookup), int(month_lookup)
+        days = [datetime.date(year, month, day) for day in range(first.day, last.day + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year_lookup}), 'title': str(year_lookup)},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT')),
+                }
+                for day in days
+            ],
+        }
+    elif year_lookup:
+        year = int(year_lookup)
+        months = [datetime.date(year, month, 1) for month in range(first.month, last.month + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month.month}),
+                    'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                }
+                for month in months
+            ],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            {'link': link({year_field: str(year)}), 'title': str(year)}
+            for year in range(first.year, last.year + 1)
+        ],
+    }
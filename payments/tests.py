@@ -1,3 +1,867 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from fractions import Fraction
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+from django.utils import timezone
+
+from construction_payments import schema
+import requests
+from rest_framework.test import APIClient
+
+from . import archive, outbox
+from .eligibility import (
+    PaymentNotEligible, apply_payment_change, apply_payment_transition, rebuild_totals, record_progress,
+    reserve_payment,
+)
+from .admin import PaymentAdmin
+from .importers import ImportCheckpoint, PaystackImporter, iter_csv_records, iter_json_records
+from .middleware import brotli
+from .models import (
+    ArchivedPayment, ArchivedTransaction, Milestone, OutboxEvent, Payment, ProgressResult, Project, SiteVideo,
+    Transaction,
+)
+from .renderers import iter_json_array
+from .serializers import PaymentSerializer, SiteVideoSerializer, TransactionSerializer
+from .site_videos import process_next_video, process_site_video
+from .video import VideoAnalysis, VideoProcessingError, analyze_video, av, iter_sampled_frames
+
+User = get_user_model()
+
+
+def _json(response):
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return json.loads(content)
+
+
+# --- Fast list path (fast_serializers, ORJSONRenderer) --------------------------------------
+
+class FastListPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('contractor', 'contractor@example.com', 'pw')
+        other = User.objects.create_user('other')
+        for i in range(3):
+            payment = Payment.objects.create(
+                user=cls.user, payment_method='Card', amount=Decimal('10.5') * (i + 1), status='Pending',
+                paystack_reference=f'ref-{i}' if i else None,
+            )
+            Transaction.objects.create(payment=payment, amount=payment.amount, status='Initiated',
+                                       paystack_charge_id=f'ch-{i}')
+        Payment.objects.create(user=other, payment_method='Card', amount=1, status='Pending')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_payment_list_matches_serializer(self):
+        response = self.client.get('/api/payments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        expected = PaymentSerializer(
+            Payment.objects.filter(user=self.user).order_by('-payment_date'), many=True,
+        ).data
+        self.assertEqual(_json(response), json.loads(json.dumps(expected)))
+
+    def test_transaction_list_matches_serializer(self):
+        response = self.client.get('/api/transactions/')
+        self.assertEqual(response.status_code, 200)
+        expected = TransactionSerializer(
+            Transaction.objects.filter(payment__user=self.user).order_by('-transaction_date'), many=True,
+        ).data
+        self.assertEqual(_json(response), json.loads(json.dumps(expected)))
+
+    def test_empty_list(self):
+        self.client.force_authenticate(User.objects.create_user('nobody'))
+        self.assertEqual(_json(self.client.get('/api/payments/')), [])
+
+    def test_gzip_stream(self):
+        response = self.client.get('/api/payments/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(b''.join(response.streaming_content)))), 3)
+
+    @unittest.skipUnless(brotli, "needs the optional brotli package")
+    def test_brotli_stream(self):
+        response = self.client.get('/api/payments/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(brotli.decompress(b''.join(response.streaming_content)))), 3)
+
+    def test_pages_with_csrf_tokens_stay_on_padded_gzip(self):
+        response = Client().get('/admin/login/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+
+    def test_iter_json_array_small_chunks(self):
+        rows = [{'id': i, 'amount': '1.50'} for i in range(5)]
+        chunks = list(iter_json_array(rows, chunk_size=8))
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(json.loads(b''.join(chunks)), [{'id': i, 'amount': '1.50'} for i in range(5)])
+
+
+# --- Cached OpenAPI schema (construction_payments/schema.py) --------------------------------
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        # Never the git-ignored openapi/ of the working copy: generated on first use unless a test writes files.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = self.settings(OPENAPI_SCHEMA_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+
+    def test_schema_served_with_etag(self):
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/payments/', json.loads(response.content)['paths'])
+        etag = response['ETag']
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_stale_etag_gets_full_response(self):
+        response = self.client.get('/swagger.yaml', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/yaml')
+
+    def test_schema_generated_once(self):
+        with mock.patch.object(schema, 'generate_schema', wraps=schema.generate_schema) as generate:
+            self.client.get('/swagger.json')
+            cached = schema.get_cached_schema('.json')
+            self.assertIs(schema.get_cached_schema('.json'), cached)
+            self.client.get('/swagger.yaml')
+        self.assertEqual(generate.call_count, 1)
+
+    def test_pre_generated_files_served(self):
+        paths = schema.write_schema_files()
+        self.assertEqual(sorted(path.name for path in paths), ['swagger.json', 'swagger.yaml'])
+        written = schema.schema_file_path('.json').read_bytes()
+        self.assertIn('/api/payments/', json.loads(written)['paths'])
+
+        with mock.patch.object(schema, 'generate_schema') as generate:
+            response = self.client.get('/swagger.json')
+            self.client.get('/swagger.yaml')
+        generate.assert_not_called()
+        self.assertEqual(response.content, written)
+        self.assertEqual(response['ETag'], schema._etag(written))
+
+    def test_files_ignored_in_debug(self):
+        schema.write_schema_files()
+        schema.schema_file_path('.json').write_bytes(b'{"paths": {}}') # stale
+        with self.settings(DEBUG=True):
+            response = self.client.get('/swagger.json')
+        self.assertIn('/api/payments/', json.loads(response.content)['paths'])
+
+
+# --- Large-table admin changelists (admin.py, templatetags/payments_admin.py) ---------------
+
+@mock.patch.object(PaymentAdmin, 'list_per_page', 2)
+class LargeTableChangeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        start = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        # Dates deliberately disagree with id order, like backdated imported history.
+        for days in (5, 1, 9, 3, 9, 7):
+            Payment.objects.create(user=cls.admin_user, payment_method='Card', amount=1, status='Completed',
+                                   payment_date=start + timedelta(days=days))
+        cls.expected = list(Payment.objects.order_by('-payment_date', '-pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def _walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            seen.extend(obj.pk for obj in cl.result_list)
+            url = cl.next_cursor_url and '/admin/payments/payment/' + cl.next_cursor_url
+        return seen
+
+    def test_cursor_pages_follow_date_ordering(self):
+        self.assertEqual(self._walk('/admin/payments/payment/'), self.expected)
+
+    def test_cursor_pages_follow_id_ordering(self):
+        # ?o=-1: list_display column 1 (id), descending
+        expected = sorted(self.expected, reverse=True)
+        self.assertEqual(self._walk('/admin/payments/payment/?o=-1'), expected)
+
+    def test_no_cursor_for_ascending_sort(self):
+        response = self.client.get('/admin/payments/payment/?o=1')
+        self.assertIsNone(response.context['cl'].next_cursor_url)
+        response = self.client.get(f'/admin/payments/payment/?o=1&before_id={self.expected[0]}')
+        self.assertRedirects(response, '/admin/payments/payment/?e=1', fetch_redirect_response=False)
+
+    def test_cursor_combines_with_filters(self):
+        response = self.client.get(f'/admin/payments/payment/?status=Completed&before_id={self.expected[1]}')
+        self.assertEqual([obj.pk for obj in response.context['cl'].result_list], self.expected[2:4])
+        self.assertNotIn('before_id', response.context['cl'].first_page_url)
+
+    def test_date_hierarchy(self):
+        response = self.client.get('/admin/payments/payment/')
+        self.assertContains(response, 'payment_date__day=2')
+        self.assertContains(response, 'payment_date__day=10')
+        response = self.client.get('/admin/payments/payment/?payment_date__year=2024&payment_date__month=3'
+                                   '&payment_date__day=10')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+
+# --- Transactional outbox (outbox.py) -------------------------------------------------------
+
+class RecordingSink(outbox.BaseSink):
+    def __init__(self, fail=False, **options):
+        super().__init__(**options)
+        self.fail = fail
+        self.batches = []
+
+    def deliver(self, messages):
+        if self.fail:
+            raise ConnectionError("sink down")
+        self.batches.append([(message['payment_id'], message['type']) for message in messages])
+
+
+class OutboxTests(TestCase):
+    def _events(self, *specs):
+        return [outbox.record_event(event_type, payment_id, {}) for payment_id, event_type in specs]
+
+    def test_delivers_and_deletes(self):
+        self._events((1, 'payment.created'), (2, 'payment.created'))
+        sink = RecordingSink()
+        self.assertEqual(outbox.dispatch_batch([sink]), (2, 0))
+        self.assertEqual(sink.batches, [[(1, 'payment.created'), (2, 'payment.created')]])
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(outbox.dispatch_batch([sink]), (0, 0))
+
+    def test_one_event_per_payment_at_a_time(self):
+        self._events((1, 'payment.created'), (1, 'payment.completed'), (2, 'payment.created'))
+        sink = RecordingSink()
+        outbox.dispatch_batch([sink])
+        outbox.dispatch_batch([sink])
+        self.assertEqual(sink.batches, [[(1, 'payment.created'), (2, 'payment.created')], [(1, 'payment.completed')]])
+
+    def test_failed_batch_is_retried_later_and_holds_back_later_events(self):
+        first, second = self._events((1, 'payment.created'), (1, 'payment.completed'))
+        with self.assertLogs('payments.outbox', 'WARNING'):
+            self.assertEqual(outbox.dispatch_batch([RecordingSink(fail=True)]), (0, 1))
+        first.refresh_from_db()
+        self.assertEqual((first.attempts, first.status, first.last_error), (1, 'pending', 'sink down'))
+        self.assertGreater(first.available_at, first.created_at)
+
+        # Backing off: neither the failed event nor the later one for the same payment is due.
+        sink = RecordingSink()
+        self.assertEqual(outbox.dispatch_batch([sink]), (0, 0))
+        OutboxEvent.objects.filter(pk=first.pk).update(available_at=first.created_at)
+        outbox.dispatch_batch([sink])
+        outbox.dispatch_batch([sink])
+        self.assertEqual(sink.batches, [[(1, 'payment.created')], [(1, 'payment.completed')]])
+
+    def test_retry_delay_is_capped(self):
+        with self.settings(OUTBOX_BACKOFF_BASE_SECONDS=2, OUTBOX_BACKOFF_MAX_SECONDS=60):
+            self.assertEqual([outbox.retry_delay(n).total_seconds() for n in (1, 2, 3, 10)], [2, 4, 8, 60])
+
+    def test_dead_after_max_attempts_releases_later_events(self):
+        first, second = self._events((1, 'payment.created'), (1, 'payment.completed'))
+        OutboxEvent.objects.filter(pk=first.pk).update(attempts=2)
+        with self.settings(OUTBOX_MAX_ATTEMPTS=3), self.assertLogs('payments.outbox', 'WARNING'):
+            outbox.dispatch_batch([RecordingSink(fail=True)])
+        first.refresh_from_db()
+        self.assertEqual((first.attempts, first.status), (3, 'dead'))
+
+        sink = RecordingSink()
+        self.assertEqual(outbox.dispatch_batch([sink]), (1, 0))
+        self.assertEqual(sink.batches, [[(1, 'payment.completed')]])
+        self.assertTrue(OutboxEvent.objects.filter(pk=first.pk, status='dead').exists())
+
+    def test_payment_changes_record_events(self):
+        user = User.objects.create_user('contractor')
+        client = APIClient()
+        client.force_authenticate(user)
+        paystack = mock.Mock(**{'json.return_value': {
+            'status': True, 'data': {'reference': 'ref-1', 'authorization_url': 'https://paystack.test/ref-1'},
+        }})
+        with mock.patch('payments.views.requests.post', return_value=paystack):
+            response = client.post('/api/payments/', {'payment_method': 'Card', 'amount': '25.00'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        payment_id = response.data['id']
+        self.assertEqual(list(OutboxEvent.objects.values_list('payment_id', 'event_type')), [
+            (payment_id, 'payment.created'), (payment_id, 'payment.initialized'), (payment_id, 'transaction.created'),
+        ])
+
+
+# --- Hot/cold archival (archive.py, archive_settled_payments) -------------------------------
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('contractor')
+        old = timezone.now() - timedelta(days=400)
+        cls.settled = []
+        for i, payment_status in enumerate(('Completed', 'Failed', 'Completed', 'Completed', 'Completed')):
+            payment = Payment.objects.create(user=cls.user, payment_method='Card', amount=10 + i,
+                                             status=payment_status, payment_date=old + timedelta(days=i),
+                                             paystack_reference=f'old-{i}')
+            Transaction.objects.create(payment=payment, amount=payment.amount, status=payment_status,
+                                       paystack_charge_id=f'old-{i}')
+            cls.settled.append(payment.pk)
+        # Not archivable: still in flight, or settled recently.
+        Payment.objects.create(user=cls.user, payment_method='Card', amount=1, status='Pending', payment_date=old)
+        Payment.objects.create(user=cls.user, payment_method='Card', amount=1, status='Completed')
+
+    def test_moves_old_settled_payments_with_transactions(self):
+        call_command('archive_settled_payments', chunk_size=2, stdout=StringIO())
+        self.assertEqual(sorted(ArchivedPayment.objects.values_list('pk', flat=True)), self.settled)
+        self.assertEqual(sorted(ArchivedTransaction.objects.values_list('payment_id', flat=True)), self.settled)
+        self.assertEqual(ArchivedPayment.objects.get(pk=self.settled[1]).status, 'Failed')
+        self.assertEqual(ArchivedTransaction.objects.get(payment_id=self.settled[0]).paystack_charge_id, 'old-0')
+        self.assertFalse(Payment.objects.filter(pk__in=self.settled).exists())
+        self.assertFalse(Transaction.objects.filter(payment_id__in=self.settled).exists())
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_interrupted_run_resumes(self):
+        cutoff = timezone.now() - timedelta(days=365)
+        self.assertEqual(archive.archive_chunk(cutoff, 2), (2, 2))
+        with mock.patch.object(ArchivedTransaction.objects, 'bulk_create', side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                archive.archive_chunk(cutoff, 2)
+        # The failed chunk was rolled back as a whole: nothing half-moved.
+        self.assertEqual(ArchivedPayment.objects.count(), 2)
+        self.assertEqual(Payment.objects.filter(pk__in=self.settled).count(), 3)
+
+        out = StringIO()
+        call_command('archive_settled_payments', chunk_size=2, stdout=out)
+        self.assertIn("Archived 3 payments and 3 transactions in 2 chunks", out.getvalue())
+        self.assertEqual(ArchivedPayment.objects.count(), 5)
+        self.assertEqual(archive.archive_chunk(cutoff, 2), (0, 0))
+
+    def test_dry_run_moves_nothing(self):
+        out = StringIO()
+        call_command('archive_settled_payments', dry_run=True, stdout=out)
+        self.assertIn("5 settled payments", out.getvalue())
+        self.assertFalse(ArchivedPayment.objects.exists())
+
+    @mock.patch('payments.views.ArchivedPaymentPagination.page_size', 2)
+    def test_archive_api_pages_by_date(self):
+        call_command('archive_settled_payments', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        seen, url = [], '/api/archive/payments/'
+        while url:
+            data = client.get(url).data
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, self.settled[::-1])
+        response = client.get(f'/api/archive/payments/{self.settled[0]}/')
+        self.assertEqual(response.data['transactions'][0]['paystack_charge_id'], 'old-0')
+        client.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(client.get(f'/api/archive/payments/{self.settled[0]}/').status_code, 404)
+
+
+# --- Progress-to-payment eligibility (eligibility.py) ---------------------------------------
+
+class EligibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('contractor')
+        cls.project = Project.objects.create(owner=cls.user, name="House")
+        cls.milestone = Milestone.objects.create(project=cls.project, name="Foundation", amount=1000)
+        cls.other_milestone = Milestone.objects.create(project=cls.project, name="Roof", amount=1000, order=1)
+
+    def _payment(self, amount, status='Pending', milestone=None, **kwargs):
+        return Payment.objects.create(user=self.user, payment_method='Card', amount=amount, status=status,
+                                      milestone=milestone or self.milestone, **kwargs)
+
+    def _totals(self, obj):
+        obj.refresh_from_db()
+        return obj.earned_amount, obj.paid_amount, obj.committed_amount, obj.releasable_amount
+
+    def test_progress_only_ever_raises_earned(self):
+        record_progress(self.milestone, 40)
+        record_progress(self.milestone, Decimal('55.5'))
+        record_progress(self.milestone, 10)
+        self.milestone.refresh_from_db()
+        self.assertEqual(self.milestone.verified_progress_percentage, Decimal('55.50'))
+        self.assertEqual(self.milestone.progress_result_count, 3)
+        self.assertEqual(self._totals(self.milestone), (Decimal('555.00'), 0, 0, Decimal('555.00')))
+        self.assertEqual(self._totals(self.project)[0], Decimal('555.00'))
+
+    def test_progress_outside_0_100_rejected(self):
+        for percentage in (250, Decimal('100.01'), -1):
+            with self.assertRaises(ValueError):
+                record_progress(self.milestone, percentage)
+        self.assertFalse(ProgressResult.objects.exists())
+        self.assertEqual(self._totals(self.milestone)[0], 0)
+
+    def test_reserve_up_to_releasable(self):
+        record_progress(self.milestone, 50)
+        reserve_payment(self._payment(300))
+        with self.assertRaises(PaymentNotEligible):
+            reserve_payment(self._payment(201))
+        reserve_payment(self._payment(200))
+        self.assertEqual(self._totals(self.milestone), (500, 0, 500, 0))
+        self.assertEqual(self._totals(self.project), (500, 0, 500, 0))
+
+    def test_api_rejects_payment_over_releasable(self):
+        record_progress(self.milestone, 10)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/payments/', {'payment_method': 'Card', 'amount': '100.01',
+                                                  'milestone': self.milestone.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('milestone', response.data)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_transitions_move_amount_between_totals(self):
+        record_progress(self.milestone, 50)
+        payment = self._payment(300)
+        reserve_payment(payment)
+        payment.status = 'Completed'
+        apply_payment_transition(payment, 'Pending')
+        apply_payment_transition(payment, 'Completed') # repeated: no-op
+        self.assertEqual(self._totals(self.milestone), (500, 300, 0, 200))
+
+        failed = self._payment(200)
+        reserve_payment(failed)
+        failed.status = 'Failed'
+        apply_payment_transition(failed, 'Pending')
+        self.assertEqual(self._totals(self.milestone), (500, 300, 0, 200))
+
+    def test_completed_payment_never_reopened(self):
+        payment = self._payment(100, status='Completed')
+        payment.status = 'Failed'
+        with self.assertRaises(ValueError):
+            apply_payment_transition(payment, 'Completed')
+
+    def test_verify_with_bad_reference_does_not_reopen_completed_payment(self):
+        record_progress(self.milestone, 50)
+        payment = self._payment(500)
+        reserve_payment(payment)
+        payment.status = 'Completed'
+        payment.save()
+        apply_payment_transition(payment, 'Pending')
+
+        with mock.patch('payments.views.requests.get', side_effect=requests.ConnectionError("bad reference")):
+            response = APIClient().get(f'/api/payments/{payment.pk}/verify/?trxref=garbage')
+        self.assertEqual(response.status_code, 500)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'Completed')
+        self.assertEqual(self._totals(self.milestone), (500, 500, 0, 0))
+        self.assertFalse(OutboxEvent.objects.filter(event_type='payment.failed').exists())
+
+    def test_verify_success_replayed(self):
+        record_progress(self.milestone, 50)
+        payment = self._payment(300, paystack_reference='ref')
+        reserve_payment(payment)
+        success = mock.Mock(**{'json.return_value': {'status': True, 'data': {'status': 'success'}}})
+        client = APIClient()
+        # Both requests loaded the payment while it was still Pending, as concurrent replays would.
+        loaded = [Payment.objects.get(pk=payment.pk) for _ in range(2)]
+        with mock.patch('payments.views.requests.get', return_value=success), \
+                mock.patch('payments.views.get_object_or_404', side_effect=loaded):
+            for _ in range(2):
+                response = client.get(f'/api/payments/{payment.pk}/verify/?trxref=ref')
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._totals(self.milestone), (500, 300, 0, 200))
+        self.assertEqual(self._totals(self.project), (500, 300, 0, 200))
+        self.assertEqual(Transaction.objects.filter(payment=payment).count(), 1)
+
+    def test_verify_failure_releases_pending_payment(self):
+        record_progress(self.milestone, 50)
+        payment = self._payment(500)
+        reserve_payment(payment)
+        failed_verification = mock.Mock(**{'json.return_value': {'status': True, 'data': {'status': 'failed'}}})
+        with mock.patch('payments.views.requests.get', return_value=failed_verification):
+            response = APIClient().get(f'/api/payments/{payment.pk}/verify/?trxref=ref')
+        self.assertEqual(response.status_code, 400)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'Failed')
+        self.assertEqual(self._totals(self.milestone), (500, 0, 0, 500))
+
+    def test_change_of_milestone_and_amount(self):
+        payment = self._payment(100)
+        apply_payment_change(payment, None, None, None)
+        payment.milestone, payment.amount = self.other_milestone, Decimal('80')
+        apply_payment_change(payment, self.milestone.pk, Decimal('100'), 'Pending')
+        self.assertEqual(self._totals(self.milestone)[2], 0)
+        self.assertEqual(self._totals(self.other_milestone)[2], 80)
+        self.assertEqual(self._totals(self.project)[2], 80)
+
+    def test_admin_edit_moves_totals(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        payment = self._payment(100)
+        apply_payment_change(payment, None, None, None)
+        response = self.client.post(f'/admin/payments/payment/{payment.pk}/change/', {
+            'user': self.user.pk, 'payment_method': 'Card', 'amount': '60.00', 'status': 'Approved',
+            'milestone': self.other_milestone.pk, 'paystack_reference': '', 'paystack_authorization_url': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._totals(self.milestone)[2], 0)
+        self.assertEqual(self._totals(self.other_milestone)[2], 60)
+
+        # Completed payments keep their status in the admin.
+        Payment.objects.filter(pk=payment.pk).update(status='Completed')
+        response = self.client.get(f'/admin/payments/payment/{payment.pk}/change/')
+        self.assertNotIn('status', response.context['adminform'].form.fields)
+
+    def test_rebuild_totals(self):
+        record_progress(self.milestone, 50)
+        self._payment(100, status='Completed')
+        self._payment(50, status='Pending')
+        self._payment(25, status='Failed')
+        ArchivedPayment.objects.create(id=10_000, user=self.user, payment_method='Card', amount=200,
+                                       status='Completed', payment_date=timezone.now(), milestone=self.milestone)
+        Milestone.objects.update(earned_amount=0, paid_amount=999, committed_amount=999)
+        Project.objects.update(paid_amount=1)
+        rebuild_totals(self.project)
+        self.assertEqual(self._totals(self.milestone), (500, 300, 50, 150))
+        self.assertEqual(self._totals(self.other_milestone), (0, 0, 0, 0))
+        self.assertEqual(self._totals(self.project), (500, 300, 50, 150))
+
+
+
+# --- Paystack history import (importers.py, import_paystack_history) -----------------------
+
+CSV_EXPORT = """Reference,Amount,Status,Channel,Paid At
+ref-a,"1,500.00",success,card,2021-05-01 10:00:00
+ref-b,20,abandoned,bank,2021-05-02
+ref-c,30,success,card,not a date
+ref-a,40,success,card,2021-05-03
+ref-d,50,reversed,card,2021-05-04T08:30:00+01:00
+"""
+
+
+class CountingReader(StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('contractor')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_records(self):
+        records = list(iter_csv_records(StringIO(CSV_EXPORT)))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], {'reference': 'ref-a', 'amount': '1,500.00', 'status': 'success',
+                                      'channel': 'card', 'paid_at': '2021-05-01 10:00:00'})
+
+    def test_json_array_api_response_and_lines(self):
+        rows = [{'Reference': f'r{i}', 'amount': 100 * i, 'note': 'x' * i} for i in range(20)]
+        for text in (json.dumps(rows), json.dumps({'status': True, 'data': rows}),
+                     '\n'.join(json.dumps(row) for row in rows) + '\n'):
+            # Tiny chunks: records are split across reads at every possible position.
+            records = list(iter_json_records(StringIO(text), chunk_size=7))
+            self.assertEqual([record['reference'] for record in records], [f'r{i}' for i in range(20)])
+        self.assertEqual(list(iter_json_records(StringIO('[1, {"a": true}]'))), [{}, {'a': True}])
+        self.assertEqual(list(iter_json_records(StringIO('  '))), [])
+
+    def test_invalid_json_fails_fast(self):
+        good = json.dumps({'reference': 'ok', 'amount': 1})
+        text = '[' + good + ', {"reference": oops}, ' + ', '.join([good] * 5000) + ']'
+        stream = CountingReader(text)
+        with self.assertRaisesMessage(ValueError, f"Invalid JSON at offset {text.index('oops')}"):
+            list(iter_json_records(stream, chunk_size=1024))
+        self.assertLessEqual(stream.reads, 2) # not the rest of the file
+
+    def test_truncated_json(self):
+        with self.assertRaisesMessage(ValueError, "Truncated or invalid JSON export"):
+            list(iter_json_records(StringIO('[{"reference": "a"}, {"reference": "b'), chunk_size=4))
+
+    def test_import_normalizes_and_skips_duplicates(self):
+        ArchivedPayment.objects.create(id=10_000, user=self.user, payment_method='card', amount=1, status='Completed',
+                                       payment_date=timezone.now(), paystack_reference='ref-d')
+        importer = PaystackImporter(self.user, batch_size=2, in_subunits=False)
+        stats = importer.run(iter_csv_records(StringIO(CSV_EXPORT)))
+        self.assertEqual((stats.records, stats.imported, stats.duplicates, stats.invalid), (5, 2, 2, 1))
+        self.assertEqual(stats.errors, [(3, "invalid date 'not a date'")])
+
+        a = Payment.objects.get(paystack_reference='ref-a')
+        self.assertEqual((a.amount, a.status, a.payment_method, a.user), (Decimal('1500.00'), 'Completed', 'card', self.user))
+        self.assertEqual(a.payment_date, datetime(2021, 5, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(a.transaction_set.get().paystack_charge_id, 'ref-a')
+        self.assertEqual(Payment.objects.get(paystack_reference='ref-b').status, 'Failed')
+
+        stats = importer.run(iter_csv_records(StringIO(CSV_EXPORT)))
+        self.assertEqual((stats.imported, stats.duplicates), (0, 4))
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_amounts_in_subunits(self):
+        records = [{'reference': 'k1', 'id': 991, 'amount': 150050, 'status': 'success', 'paid_at': '2022-01-01'}]
+        PaystackImporter(self.user).run(records)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.amount, Decimal('1500.50'))
+        self.assertEqual(payment.transaction_set.get().paystack_charge_id, '991')
+
+    def test_command_resumes_from_checkpoint(self):
+        rows = [{'reference': f'r{i}', 'id': i, 'amount': 1000, 'status': 'success',
+                 'paid_at': f'2020-01-{i + 1:02d}T00:00:00Z'} for i in range(7)]
+        path = self._write('export.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+        original = PaystackImporter._import_batch
+        calls = 0
+
+        def interrupted(importer, batch, stats):
+            nonlocal calls
+            calls += 1
+            if calls == 3:
+                raise OSError("connection lost")
+            original(importer, batch, stats)
+
+        with mock.patch.object(PaystackImporter, '_import_batch', interrupted):
+            with self.assertRaisesMessage(CommandError, "connection lost"):
+                call_command('import_paystack_history', path, user='contractor', batch_size=2, stdout=StringIO())
+        self.assertEqual(ImportCheckpoint(path).load(), 4)
+        self.assertEqual(Payment.objects.count(), 4)
+
+        out = StringIO()
+        call_command('import_paystack_history', path, user='contractor', batch_size=2, stdout=out)
+        self.assertIn("Resuming after record 4", out.getvalue())
+        self.assertIn("Imported 3 payments", out.getvalue())
+        self.assertEqual(Payment.objects.count(), 7)
+        self.assertEqual(Payment.objects.get(paystack_reference='r6').amount, Decimal('10.00'))
+        self.assertFalse(os.path.exists(ImportCheckpoint(path).state_path))
+
+    def test_checkpoint_ignored_for_a_different_file(self):
+        path = self._write('export.csv', CSV_EXPORT)
+        ImportCheckpoint(path).save(3)
+        self.assertEqual(ImportCheckpoint(path).load(), 3)
+        self._write('export.csv', CSV_EXPORT + 'ref-e,1,success,card,2021-06-01\n')
+        self.assertEqual(ImportCheckpoint(path).load(), 0)
+
+    def test_admin_import(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.assertContains(self.client.get('/admin/payments/payment/'), 'Import Paystack export')
+        export = SimpleUploadedFile('export.csv', CSV_EXPORT.encode())
+        response = self.client.post('/admin/payments/payment/import/', {'export': export, 'username': 'contractor'})
+        self.assertRedirects(response, '/admin/payments/payment/', fetch_redirect_response=False)
+        self.assertEqual(Payment.objects.filter(user=self.user).count(), 3)
+
+        # The archive admin shares the list but not the import.
+        self.assertNotContains(self.client.get('/admin/payments/archivedpayment/'), 'Import Paystack export')
+        # No import view: Django treats "import" as an object id.
+        response = self.client.get('/admin/payments/archivedpayment/import/')
+        self.assertRedirects(response, '/admin/payments/archivedpayment/import/change/', fetch_redirect_response=False)
+
+
+# --- Site videos (video.py, site_videos.py, process_site_videos) ----------------------------
+
+def write_clip(path, shades, fps=8, frames_per_shade=8, gop_size=1000):
+    """
+    Encode a tiny grayscale clip: `frames_per_shade` frames of each solid shade (0-255) in turn.
+    """
+    from PIL import Image
+
+    with av.open(path, 'w') as container:
+        stream = container.add_stream('mpeg4', rate=fps)
+        stream.width = stream.height = 64
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.gop_size = gop_size
+        number = 0
+        for shade in shades:
+            image = Image.new('RGB', (64, 64), (shade, shade, shade))
+            for _ in range(frames_per_shade):
+                frame = av.VideoFrame.from_image(image)
+                frame.pts, frame.time_base = number, Fraction(1, fps)
+                container.mux(stream.encode(frame))
+                number += 1
+        container.mux(stream.encode())
+
+
+@unittest.skipUnless(av, "needs the optional PyAV and Pillow packages")
+class FrameSamplingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'clip.mp4')
+
+    def _sample(self, **options):
+        analysis = VideoAnalysis()
+        options = {'max_fps': 1.0, 'scene_threshold': 0.25, 'dedup_max_difference': 0.1, **options}
+        seconds = [round(s, 3) for s, frame in iter_sampled_frames(self.path, analysis, **options)]
+        return seconds, analysis
+
+    def test_scene_changes_and_near_duplicates(self):
+        write_clip(self.path, (0, 255, 0, 128)) # black, white, black again, gray: one second each
+        seconds, analysis = self._sample()
+        # One keyframe at the start; the return to black is a near duplicate of the first frame.
+        self.assertEqual(seconds, [0.0, 1.0, 3.0])
+        self.assertEqual(analysis.frames_decoded, 32)
+        self.assertAlmostEqual(analysis.duration_seconds, 3.875)
+
+        seconds, analysis = self._sample(dedup_max_difference=-1) # nothing counts as a duplicate
+        self.assertEqual(seconds, [0.0, 1.0, 2.0, 3.0])
+
+    def test_max_fps(self):
+        write_clip(self.path, (0, 255) * 4, frames_per_shade=2) # a new scene every 0.25s
+        seconds, analysis = self._sample(dedup_max_difference=-1)
+        self.assertEqual(len(seconds), 2)
+        self.assertGreaterEqual(seconds[1] - seconds[0], 1.0)
+        self.assertEqual(self._sample(max_fps=0, dedup_max_difference=-1)[0], [0.0, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75])
+
+    def test_keyframes_only(self):
+        write_clip(self.path, (0, 255, 0, 128), gop_size=8) # a keyframe every second
+        seconds, analysis = self._sample(scene_threshold=0)
+        self.assertEqual(seconds, [0.0, 1.0, 3.0])
+        self.assertEqual(analysis.frames_decoded, 4) # the decoder skipped every non-key frame
+
+    def test_not_a_video(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a video')
+        with self.assertRaises(VideoProcessingError):
+            self._sample()
+
+
+class SiteVideoProcessingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('owner')
+        cls.milestone = Milestone.objects.create(
+            project=Project.objects.create(owner=user, name="House"), name="Walls", amount=1000,
+        )
+        cls.video = SiteVideo.objects.create(milestone=cls.milestone, uploaded_by=user, video='site_videos/walk.mp4')
+
+    def _analysis(self, verified, percentages=(70, 80, 90)):
+        analysis = VideoAnalysis(verified=verified)
+        analysis.frames_decoded, analysis.frames_sampled, analysis.duration_seconds = 240, 3, 10.0
+        analysis.percentages = list(percentages)
+        return analysis
+
+    def test_verified_progress_recorded(self):
+        with mock.patch('payments.site_videos.analyze_video', return_value=self._analysis(verified=True)):
+            video = process_site_video(self.video)
+        self.assertEqual(video.status, SiteVideo.STATUS_PROCESSED)
+        self.assertEqual(video.progress_result.verified_progress_percentage, 80)
+        self.milestone.refresh_from_db()
+        self.assertEqual(self.milestone.earned_amount, 800)
+
+    def test_simulated_analysis_never_verifies_progress(self):
+        with mock.patch('payments.site_videos.analyze_video', return_value=self._analysis(verified=False)):
+            video = process_site_video(self.video)
+        self.assertEqual((video.status, video.frames_sampled), (SiteVideo.STATUS_UNVERIFIED, 3))
+        self.assertIsNone(video.progress_result)
+        self.assertFalse(ProgressResult.objects.exists())
+        self.milestone.refresh_from_db()
+        self.assertEqual(self.milestone.earned_amount, 0)
+
+    def test_no_analyzer_configured(self):
+        with self.settings(PROGRESS_FRAME_ANALYZER=None), self.assertLogs('payments.site_videos', 'WARNING'):
+            video = process_site_video(self.video)
+        self.assertEqual(video.status, SiteVideo.STATUS_FAILED)
+        self.assertIn("PROGRESS_FRAME_ANALYZER", video.error)
+
+    def test_simulated_analyzer_is_unverified(self):
+        with self.settings(PROGRESS_FRAME_ANALYZER={'BACKEND': 'payments.video.SimulatedFrameAnalyzer'}), \
+                mock.patch('payments.video.iter_sampled_frames', return_value=iter(())):
+            analysis = analyze_video('unused.mp4')
+        self.assertFalse(analysis.verified)
+        self.assertIsNone(analysis.progress_percentage)
+
+
+    def test_worker_claims_pending_videos_in_order(self):
+        later = SiteVideo.objects.create(milestone=self.milestone, uploaded_by=self.video.uploaded_by,
+                                         video='site_videos/later.mp4')
+        SiteVideo.objects.filter(pk=self.video.pk).update(status=SiteVideo.STATUS_FAILED)
+        with mock.patch('payments.site_videos.analyze_video', return_value=self._analysis(verified=True)) as analyze:
+            self.assertEqual(process_next_video().pk, later.pk)
+            self.assertIsNone(process_next_video())
+        analyze.assert_called_once_with(later.video.path)
+        later.refresh_from_db()
+        self.assertEqual(later.status, SiteVideo.STATUS_PROCESSED)
+
+    def test_unexpected_error_fails_the_video(self):
+        with mock.patch('payments.site_videos.analyze_video', side_effect=MemoryError("decoder blew up")), \
+                self.assertLogs('payments.site_videos', 'ERROR'):
+            video = process_next_video()
+        self.assertEqual(video.status, SiteVideo.STATUS_FAILED)
+        self.video.refresh_from_db()
+        self.assertEqual((self.video.status, self.video.error), (SiteVideo.STATUS_FAILED, "Processing failed: decoder blew up"))
+        self.assertIsNone(process_next_video())
+
+    def test_command(self):
+        out = StringIO()
+        with mock.patch('payments.site_videos.analyze_video', return_value=self._analysis(verified=True)):
+            call_command('process_site_videos', once=True, stdout=out)
+        self.assertIn("Processed 1 videos.", out.getvalue())
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.status, SiteVideo.STATUS_PROCESSED)
+
+    def _upload(self, name='walk.mp4', content_type='video/mp4', size=1024, **settings):
+        client = APIClient()
+        client.force_authenticate(self.video.uploaded_by)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = {'MEDIA_ROOT': media.name,
+                    'PROGRESS_FRAME_ANALYZER': {'BACKEND': 'payments.video.SimulatedFrameAnalyzer'}, **settings}
+        with self.settings(**settings), mock.patch('payments.site_videos.analyze_video') as analyze:
+            response = client.post(f'/api/milestones/{self.milestone.pk}/videos/',
+                                   {'video': SimpleUploadedFile(name, b'\0' * size, content_type)}, format='multipart')
+        analyze.assert_not_called()
+        return response
+
+    def test_upload_is_queued(self):
+        response = self._upload()
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual((response.data['status'], response.data['verified_progress_percentage']), ('pending', None))
+        self.assertEqual(SiteVideo.objects.count(), 2)
+
+    def test_upload_refused_without_analyzer(self):
+        with mock.patch('payments.views.TemporaryFileUploadHandler') as handler:
+            response = self._upload(PROGRESS_FRAME_ANALYZER=None)
+        self.assertEqual(response.status_code, 503)
+        handler.assert_not_called() # refused before the body is read
+        self.assertEqual(SiteVideo.objects.count(), 1)
+
+    def test_upload_too_large(self):
+        response = self._upload(size=4096, VIDEO_UPLOAD_MAX_BYTES=2048)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(SiteVideo.objects.count(), 1)
+
+    def test_upload_must_be_a_video(self):
+        for name, content_type in (('walk.exe', 'video/mp4'), ('walk.mp4', 'application/octet-stream')):
+            response = self._upload(name=name, content_type=content_type)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('video', response.data)
+        self.assertEqual(SiteVideo.objects.count(), 1)
+
+    def test_size_checked_on_the_file_too(self):
+        # e.g. a chunked upload without Content-Length
+        with self.settings(VIDEO_UPLOAD_MAX_BYTES=4000):
+            serializer = SiteVideoSerializer(data={'video': SimpleUploadedFile('walk.mp4', b'\0' * 4096, 'video/mp4')})
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['video'], ["The video is larger than 3.9\xa0KB."])
+
+
+class SchemaGenerationTests(TestCase):
+    def test_views_short_circuit_for_fake_requests(self):
+        with mock.patch('drf_yasg.inspectors.base.logger') as logger:
+            schema.generate_schema()
+        self.assertFalse(logger.warning.called, logger.warning.call_args)
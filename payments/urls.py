@@ -6,7 +6,14 @@ from .views import (
     PaymentListCreateAPIView,
     PaymentDetailAPIView,
     TransactionListAPIView,
-    PaystackVerifyPaymentAPIView # <--- IMPORT NEW VIEW
+    PaystackVerifyPaymentAPIView, # <--- IMPORT NEW VIEW
+    ArchivedPaymentListAPIView,
+    ArchivedPaymentDetailAPIView,
+    ArchivedTransactionListAPIView,
+    ProjectListCreateAPIView,
+    ProjectDetailAPIView,
+    MilestoneListCreateAPIView,
+    SiteVideoListCreateAPIView,
 )
 from rest_framework.urlpatterns import format_suffix_patterns
 
@@ -24,6 +31,16 @@ urlpatterns = [
 
     path('payments/<int:pk>/verify/', PaystackVerifyPaymentAPIView.as_view(), name='paystack-verify-payment'), # <--- ADD THIS LINE
 
+    # Projects & milestones (payments are requested against milestones)
+    path('projects/', ProjectListCreateAPIView.as_view(), name='project-list-create'),
+    path('projects/<int:pk>/', ProjectDetailAPIView.as_view(), name='project-detail'),
+    path('projects/<int:pk>/milestones/', MilestoneListCreateAPIView.as_view(), name='milestone-list-create'),
+    path('milestones/<int:pk>/videos/', SiteVideoListCreateAPIView.as_view(), name='site-video-list-create'),
+
+    # Archive (read-only): settled payments moved out of the live tables by `manage.py archive_settled_payments`
+    path('archive/payments/', ArchivedPaymentListAPIView.as_view(), name='archived-payment-list'),
+    path('archive/payments/<int:pk>/', ArchivedPaymentDetailAPIView.as_view(), name='archived-payment-detail'),
+    path('archive/transactions/', ArchivedTransactionListAPIView.as_view(), name='archived-transaction-list'),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
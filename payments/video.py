@@ -0,0 +1,300 @@
+# payments/video.py
+
+"""
+Site video ingestion for progress verification.
+
+A walkthrough video has thousands of frames, nearly all of them redundant, and analyzing every one
+would take far longer than the NFR-PERF-002 budget. `analyze_video` decodes the file incrementally,
+one frame at a time, and selects only:
+
+- keyframes, and frames where the scene changed since the previous check,
+- at most `max_fps` frames per second of video,
+- frames that don't look nearly identical to one selected recently (difference hash and tones).
+
+Selected frames are written as JPEGs to a scratch directory and analyzed in parallel by a pool of
+worker processes, with a bounded number in flight, so memory stays flat however long the video is.
+The per-frame percentages are aggregated (median) into one progress value for the video.
+Only an analyzer that `verifies_progress` produces a value that may be recorded against the milestone.
+
+Videos are analyzed out of band by `manage.py process_site_videos` (payments/site_videos.py), never
+in a web request; each of those worker processes starts its own pool of VIDEO_ANALYSIS_WORKERS
+analysis processes (default: one per CPU).
+
+Decoding needs the optional PyAV and Pillow packages (`pip install av Pillow`).
+The worker processes import this module, so it must not import models.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import av
+    import PIL.Image # noqa: F401 - used by av's VideoFrame.to_image()
+except ImportError: # optional; only needed when videos are processed
+    av = None
+
+THUMBNAIL_SIZE = 16 # grayscale thumbnail used for scene-change and near-duplicate checks
+SCENE_CHECKS_PER_SECOND = 4 # non-key frames inspected for scene changes, per second of video
+DEDUP_WINDOW = 16 # a new frame is compared with this many recently selected frames
+ANALYSIS_MAX_WIDTH = 1280 # frames are downscaled to at most this width before analysis
+JPEG_QUALITY = 85
+
+
+class VideoProcessingError(Exception):
+    """
+    The video couldn't be decoded or analyzed.
+    """
+
+
+class VideoSupportUnavailable(VideoProcessingError):
+    """
+    PyAV/Pillow are not installed, or no progress analyzer is configured.
+    """
+
+
+# --- Analyzers -----------------------------------------------------------------------------
+
+class BaseFrameAnalyzer:
+    """
+    Estimates a milestone's completion (0-100) from one frame. `analyze` runs in a worker process
+    and gets the path of a JPEG; it returns None when the frame shows nothing it can judge.
+    Results of analyzers whose `verifies_progress` is False are never recorded against a milestone.
+    """
+    verifies_progress = True
+
+    def __init__(self, **options):
+        self.options = options
+
+    def analyze(self, image_path):
+        raise NotImplementedError
+
+
+class SimulatedFrameAnalyzer(BaseFrameAnalyzer):
+    """
+    Stand-in for the object-detection model (the "simulated AI analysis" of FR-AI-002):
+    a deterministic percentage between MIN and MAX derived from the image content.
+    For exercising the pipeline only: its results don't count as verified progress.
+    """
+    verifies_progress = False
+
+    def __init__(self, MIN=0, MAX=100, **options):
+        super().__init__(**options)
+        self.minimum = MIN
+        self.maximum = MAX
+
+    def analyze(self, image_path):
+        with open(image_path, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=4).digest()
+        span = int((self.maximum - self.minimum) * 100)
+        return self.minimum + int.from_bytes(digest, 'big') % (span + 1) / 100
+
+
+def analyzer_config():
+    """
+    The PROGRESS_FRAME_ANALYZER setting. Raises VideoSupportUnavailable if none is configured.
+    """
+    config = getattr(settings, 'PROGRESS_FRAME_ANALYZER', None)
+    if not config:
+        raise VideoSupportUnavailable("No progress analyzer is configured (PROGRESS_FRAME_ANALYZER).")
+    return config
+
+
+_worker_analyzer = None
+
+
+def _init_worker(config):
+    global _worker_analyzer
+    _worker_analyzer = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def _analyze_frame(image_path):
+    try:
+        return _worker_analyzer.analyze(image_path)
+    finally:
+        os.remove(image_path) # keeps the scratch directory small on long videos
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def analysis_pool():
+    """
+    The worker pool shared by every video processed in this process, created on first use.
+    Returns (executor, number of workers).
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = getattr(settings, 'VIDEO_ANALYSIS_WORKERS', None) or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                # Workers only need this module and the analyzer, not a forked copy of the web process.
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(analyzer_config(),),
+            )
+        return _pool, _pool_workers
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# --- Sampling ------------------------------------------------------------------------------
+
+def _thumbnail(frame):
+    return frame.reformat(width=THUMBNAIL_SIZE, height=THUMBNAIL_SIZE, format='gray').to_image().tobytes()
+
+
+def _difference(a, b):
+    """
+    Mean absolute pixel difference of two thumbnails, from 0 (identical) to 1.
+    """
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255 * len(a))
+
+
+def _dhash(thumbnail):
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of the thumbnail.
+    """
+    bits = 0
+    for row in range(THUMBNAIL_SIZE):
+        offset = row * THUMBNAIL_SIZE
+        for col in range(THUMBNAIL_SIZE - 1):
+            bits = (bits << 1) | (thumbnail[offset + col] > thumbnail[offset + col + 1])
+    return bits
+
+
+class VideoAnalysis:
+    def __init__(self, verified=True):
+        self.verified = verified # False: the analyzer doesn't verify progress (e.g. SimulatedFrameAnalyzer)
+        self.duration_seconds = 0.0
+        self.frames_decoded = 0
+        self.frames_sampled = 0
+        self.percentages = [] # one per analyzed frame
+
+    @property
+    def progress_percentage(self):
+        """
+        Median of the per-frame results (robust to a few misjudged frames), or None.
+        """
+        return statistics.median(self.percentages) if self.percentages else None
+
+
+def iter_sampled_frames(path, analysis, max_fps, scene_threshold, dedup_max_difference):
+    """
+    Decode `path` incrementally and yield (seconds, av.VideoFrame) for the frames worth analyzing.
+    `analysis` (a VideoAnalysis) is updated with the decoded frame count and the duration.
+    With `scene_threshold` 0 only keyframes are considered, and the decoder skips every other frame.
+    """
+    if av is None:
+        raise VideoSupportUnavailable("Video processing needs PyAV and Pillow: pip install av Pillow")
+    min_gap = 1 / max_fps if max_fps else 0
+    max_distance = int(dedup_max_difference * THUMBNAIL_SIZE * (THUMBNAIL_SIZE - 1))
+    recent = deque(maxlen=DEDUP_WINDOW) # (hash, thumbnail) of recently selected frames
+    next_allowed = next_scan = float('-inf')
+    previous_thumbnail = None
+    try:
+        with av.open(path) as container:
+            if not container.streams.video:
+                raise VideoProcessingError("The file has no video stream.")
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO' # frame- and slice-threaded decoding
+            if not scene_threshold:
+                stream.codec_context.skip_frame = 'NONKEY'
+            for frame in container.decode(stream):
+                analysis.frames_decoded += 1
+                seconds = frame.time or 0.0
+                analysis.duration_seconds = max(analysis.duration_seconds, seconds)
+                if seconds < next_allowed or (not frame.key_frame and seconds < next_scan):
+                    continue
+                next_scan = seconds + 1 / SCENE_CHECKS_PER_SECOND
+                thumbnail = _thumbnail(frame)
+                scene_change = (previous_thumbnail is None
+                                or (scene_threshold and _difference(thumbnail, previous_thumbnail) >= scene_threshold))
+                previous_thumbnail = thumbnail
+                if not (frame.key_frame or scene_change):
+                    continue
+                fingerprint = _dhash(thumbnail)
+                if any((fingerprint ^ seen_hash).bit_count() <= max_distance
+                       and _difference(thumbnail, seen_thumbnail) <= dedup_max_difference
+                       for seen_hash, seen_thumbnail in recent):
+                    continue # same structure and tones as a frame already selected
+                recent.append((fingerprint, thumbnail))
+                next_allowed = seconds + min_gap
+                yield seconds, frame
+    except av.error.FFmpegError as e:
+        raise VideoProcessingError(f"Could not decode the video: {e}")
+
+
+def _save_frame(frame, directory, number):
+    if frame.width > ANALYSIS_MAX_WIDTH:
+        frame = frame.reformat(width=ANALYSIS_MAX_WIDTH, height=frame.height * ANALYSIS_MAX_WIDTH // frame.width)
+    image_path = os.path.join(directory, f'frame-{number:06d}.jpg')
+    frame.to_image().save(image_path, quality=JPEG_QUALITY)
+    return image_path
+
+
+def _collect(futures, analysis):
+    for future in futures:
+        try:
+            percentage = future.result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            raise VideoProcessingError(f"Frame analysis failed: {e}") from e
+        if percentage is not None:
+            analysis.percentages.append(min(max(float(percentage), 0.0), 100.0))
+
+
+def analyze_video(path, max_fps=None, scene_threshold=None, dedup_max_difference=None):
+    """
+    Sample the video at `path`, analyze the selected frames in the worker pool and return a
+    VideoAnalysis. Settings provide the defaults. Raises VideoProcessingError.
+    """
+    if max_fps is None:
+        max_fps = getattr(settings, 'VIDEO_SAMPLE_MAX_FPS', 1.0)
+    if scene_threshold is None:
+        scene_threshold = getattr(settings, 'VIDEO_SCENE_CHANGE_THRESHOLD', 0.25)
+    if dedup_max_difference is None:
+        dedup_max_difference = getattr(settings, 'VIDEO_DEDUP_MAX_DIFFERENCE', 0.1)
+
+    analyzer = import_string(analyzer_config()['BACKEND'])
+    analysis = VideoAnalysis(verified=analyzer.verifies_progress)
+    frames = iter_sampled_frames(path, analysis, max_fps, scene_threshold, dedup_max_difference)
+    pool, workers = analysis_pool()
+    pending = set()
+    with tempfile.TemporaryDirectory(prefix='site-video-') as scratch:
+        try:
+            for seconds, frame in frames:
+                analysis.frames_sampled += 1
+                pending.add(pool.submit(_analyze_frame, _save_frame(frame, scratch, analysis.frames_sampled)))
+                if len(pending) >= 2 * workers: # bounded: decoding waits for the analyzers
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done, analysis)
+            done, pending = wait(pending)
+            _collect(done, analysis)
+        except BrokenProcessPool as e:
+            _discard_pool()
+            raise VideoProcessingError(f"A frame analysis worker died: {e}")
+        finally:
+            for future in pending: # only on errors: don't leave work running against the scratch directory
+                future.cancel()
+            wait(pending)
+    return analysis
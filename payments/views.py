@@ -4,18 +4,54 @@ from django.conf import settings # <--- ADD THIS IMPORT to access PAYSTACK_SECRE
 import json # <--- ADD THIS IMPORT for handling JSON responses
 
 from rest_framework import generics, status
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView # Can keep if needed for very custom logic later
 from rest_framework.permissions import IsAuthenticated, AllowAny # AllowAny for registration
 from django.shortcuts import get_object_or_404
 from rest_framework.reverse import reverse
 from rest_framework.decorators import api_view # Import for function-based views
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser
 
-from .models import Payment, Transaction
-from .serializers import PaymentSerializer, TransactionSerializer, UserSerializer, UserRegistrationSerializer
+from .models import ArchivedPayment, ArchivedTransaction, Milestone, Payment, Project, SiteVideo, Transaction
+from .serializers import (
+    PaymentSerializer, TransactionSerializer, UserSerializer, UserRegistrationSerializer,
+    ArchivedPaymentSerializer, ArchivedTransactionSerializer, MilestoneSerializer, ProjectSerializer,
+    SiteVideoSerializer,
+)
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token # Import Token model for manual token creation if needed
+from django.http import StreamingHttpResponse
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.db import transaction as db_transaction # `transaction` is used for Transaction instances below
 
+from .fast_serializers import iter_payment_rows, iter_transaction_rows
+from .renderers import ORJSONRenderer, iter_json_array
+from .outbox import record_payment_event, record_transaction_event
+from .eligibility import (
+    COMMITTED_STATUSES, PaymentNotEligible, apply_payment_transition, reserve_payment,
+)
+
+
+def mark_payment_failed(payment):
+    """
+    Set the payment to 'Failed', release its milestone reservation and record the outbox event,
+    all in the same database transaction. Only in-flight (Pending/Approved) payments can fail:
+    the verify callback is public, and a bad reference must not reopen a Completed payment.
+    Returns whether the payment was marked failed.
+    """
+    with db_transaction.atomic():
+        locked = Payment.objects.select_for_update().get(pk=payment.pk)
+        if locked.status not in COMMITTED_STATUSES:
+            return False
+        old_status = locked.status
+        locked.status = payment.status = 'Failed'
+        locked.save(update_fields=['status'])
+        apply_payment_transition(locked, old_status)
+        record_payment_event(locked, 'payment.failed')
+    return True
 
 
 # --- New API Root View ---
@@ -27,6 +63,9 @@ def api_root(request, format=None):
     return Response({
         'payments': reverse('payment-list-create', request=request, format=format),
         'transactions': reverse('transaction-list', request=request, format=format),
+        'projects': reverse('project-list-create', request=request, format=format),
+        'archived_payments': reverse('archived-payment-list', request=request, format=format),
+        'archived_transactions': reverse('archived-transaction-list', request=request, format=format),
         # Add more API endpoints here as you build them
     })
 
@@ -56,7 +95,28 @@ class UserRegistrationAPIView(generics.CreateAPIView):
 
 # --- End New API Root View ---
 
-class PaymentListCreateAPIView(generics.ListCreateAPIView):
+class FastListMixin:
+    """
+    Read-only fast path for list endpoints.
+    Builds the response from `.values()` rows (see fast_serializers) instead of one serializer
+    instance per object. JSON clients get a streamed orjson array; other renderers such as
+    the browsable API get a regular Response with the same data.
+    """
+    row_iterator = None  # callable(queryset) -> iterable of serializer-shaped dicts
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            # Pagination works on model instances; keep the regular serializer path for it.
+            return super().list(request, *args, **kwargs)
+
+        rows = self.row_iterator(self.filter_queryset(self.get_queryset()))
+        renderer = request.accepted_renderer
+        if isinstance(renderer, ORJSONRenderer) and not renderer.get_indent(request.accepted_media_type, {}):
+            return StreamingHttpResponse(iter_json_array(rows), content_type=renderer.media_type)
+        return Response(list(rows))
+
+
+class PaymentListCreateAPIView(FastListMixin, generics.ListCreateAPIView):
     """
     API view to list all payments for the authenticated user or create a new payment.
     - GET: List payments (filtered by user)
@@ -64,6 +124,7 @@ class PaymentListCreateAPIView(generics.ListCreateAPIView):
     """
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated] # Requires authentication
+    row_iterator = staticmethod(iter_payment_rows) # GET uses the .values() fast path, POST still goes through PaymentSerializer
 
     def get_queryset(self):
         """
@@ -78,7 +139,14 @@ class PaymentListCreateAPIView(generics.ListCreateAPIView):
         """
         # The user field is read_only in the serializer, so we set it here.
         # Initial status is also set by the backend.
-        payment = serializer.save(user=self.request.user, status='Pending')
+        with db_transaction.atomic():
+            payment = serializer.save(user=self.request.user, status='Pending')
+            try:
+                # O(1) check against the milestone's running totals; reserves the amount if allowed
+                reserve_payment(payment)
+            except PaymentNotEligible as e:
+                raise ValidationError({'milestone': [str(e)]}) # rolls back the new payment
+            record_payment_event(payment, 'payment.created')
 
         # --- NEW: Initialize Paystack Transaction ---
         try:
@@ -112,32 +180,32 @@ class PaymentListCreateAPIView(generics.ListCreateAPIView):
             paystack_response = response.json()
 
             if paystack_response['status'] and paystack_response['data']['authorization_url']:
-                payment.paystack_reference = paystack_response['data']['reference']
-                payment.paystack_authorization_url = paystack_response['data']['authorization_url']
-                payment.save()
-
-                # Also create an initial Transaction for the payment
-                Transaction.objects.create(
-                    payment=payment,
-                    amount=payment.amount,
-                    status='Initiated',
-                    paystack_charge_id=payment.paystack_reference # Use Paystack reference for initial transaction
-                )
+                with db_transaction.atomic():
+                    payment.paystack_reference = paystack_response['data']['reference']
+                    payment.paystack_authorization_url = paystack_response['data']['authorization_url']
+                    payment.save()
+
+                    # Also create an initial Transaction for the payment
+                    transaction = Transaction.objects.create(
+                        payment=payment,
+                        amount=payment.amount,
+                        status='Initiated',
+                        paystack_charge_id=payment.paystack_reference # Use Paystack reference for initial transaction
+                    )
+                    record_payment_event(payment, 'payment.initialized')
+                    record_transaction_event(transaction, 'transaction.created')
             else:
-                payment.status = 'Failed'
-                payment.save()
+                mark_payment_failed(payment)
                 return Response({'error': paystack_response.get('message', 'Paystack initialization failed')},
                                 status=status.HTTP_400_BAD_REQUEST)
 
         except requests.exceptions.RequestException as e:
             # Handle network or HTTP errors from requests library
-            payment.status = 'Failed'
-            payment.save()
+            mark_payment_failed(payment)
             return Response({'error': f"Network or Paystack API error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
             # Handle other unexpected errors
-            payment.status = 'Failed'
-            payment.save()
+            mark_payment_failed(payment)
             return Response({'error': 'An unexpected error occurred: ' + str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class PaystackVerifyPaymentAPIView(APIView):
@@ -169,42 +237,47 @@ class PaystackVerifyPaymentAPIView(APIView):
             paystack_response = response.json()
 
             if paystack_response['status'] and paystack_response['data']['status'] == 'success':
-                # Update payment status
-                payment.status = 'Completed'
-                payment.save()
-
-                # Update or create a transaction record for the successful payment
-                # Find the initiated transaction or create a new one
-                transaction, created = Transaction.objects.get_or_create(
-                    payment=payment,
-                    paystack_charge_id=paystack_reference,
-                    defaults={
-                        'amount': payment.amount,
-                        'status': 'Completed'
-                    }
-                )
-                if not created:
-                    transaction.status = 'Completed'
-                    transaction.amount = payment.amount # Ensure amount is consistent
-                    transaction.save()
+                with db_transaction.atomic():
+                    # Update payment status. Locked and re-read: the callback is public and may be replayed
+                    # concurrently, and only one replay may move the amount from committed to paid.
+                    payment = Payment.objects.select_for_update().get(pk=payment.pk)
+                    old_status = payment.status
+                    payment.status = 'Completed'
+                    payment.save()
+                    apply_payment_transition(payment, old_status) # committed -> paid on the milestone
+
+                    # Update or create a transaction record for the successful payment
+                    # Find the initiated transaction or create a new one
+                    transaction, created = Transaction.objects.get_or_create(
+                        payment=payment,
+                        paystack_charge_id=paystack_reference,
+                        defaults={
+                            'amount': payment.amount,
+                            'status': 'Completed'
+                        }
+                    )
+                    if not created:
+                        transaction.status = 'Completed'
+                        transaction.amount = payment.amount # Ensure amount is consistent
+                        transaction.save()
+
+                    record_payment_event(payment, 'payment.completed')
+                    record_transaction_event(transaction, 'transaction.completed')
 
                 return Response({'message': 'Payment verified successfully!', 'payment_status': 'completed'}, status=status.HTTP_200_OK)
             else:
                 # Payment not successful or verification failed
-                payment.status = 'Failed'
-                payment.save()
+                mark_payment_failed(payment)
                 # return Response({'error': 'Payment verification failed.', 'details': paystack_response.get('message')}, status=status.400_BAD_REQUEST)
                 return Response({'error': 'Payment verification failed.', 'details': paystack_response.get('message')}, status=status.HTTP_400_BAD_REQUEST)
 
         except requests.exceptions.RequestException as e:
             # Handle network or HTTP errors
-            payment.status = 'Failed' # Update payment status to reflect error
-            payment.save()
+            mark_payment_failed(payment) # Update payment status to reflect error
             return Response({'error': f"Network or Paystack API error during verification: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
             # Handle other unexpected errors
-            payment.status = 'Failed'
-            payment.save()
+            mark_payment_failed(payment)
             return Response({'error': 'An unexpected error occurred during verification: ' + str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -234,13 +307,14 @@ class PaymentDetailAPIView(generics.RetrieveAPIView):
         # implement more granular object-level permissions (e.g., using Django Guardian).
         return obj
 
-class TransactionListAPIView(generics.ListAPIView):
+class TransactionListAPIView(FastListMixin, generics.ListAPIView):
     """
     API view to list all transactions for the authenticated user's payments.
     - GET: List transactions (filtered by user's payments)
     """
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    row_iterator = staticmethod(iter_transaction_rows)
 
     def get_queryset(self):
         """
@@ -248,3 +322,183 @@ class TransactionListAPIView(generics.ListAPIView):
         """
         return Transaction.objects.filter(payment__user=self.request.user).order_by('-transaction_date')
 
+
+
+# --- Projects & milestones ---
+
+class ProjectListCreateAPIView(generics.ListCreateAPIView):
+    """
+    API view to list or create the authenticated user's projects.
+    - GET: List projects with milestones and running payment totals
+    - POST: Create a project (owner set automatically)
+    """
+    serializer_class = ProjectSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Project.objects.filter(owner=self.request.user).prefetch_related('milestones')
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class ProjectDetailAPIView(generics.RetrieveAPIView):
+    """
+    API view to retrieve a single project. Only accessible by its owner.
+    """
+    serializer_class = ProjectSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False): # schema generation: no request user
+            return Project.objects.none()
+        return Project.objects.filter(owner=self.request.user).prefetch_related('milestones')
+
+
+class MilestoneListCreateAPIView(generics.ListCreateAPIView):
+    """
+    API view to list or add milestones of one of the authenticated user's projects.
+    - GET: List milestones with verified progress and releasable amounts
+    - POST: Add a milestone
+    """
+    serializer_class = MilestoneSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_project(self):
+        return get_object_or_404(Project, pk=self.kwargs['pk'], owner=self.request.user)
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False): # schema generation: no project pk or user
+            return Milestone.objects.none()
+        return Milestone.objects.filter(project=self.get_project())
+
+    def perform_create(self, serializer):
+        serializer.save(project=self.get_project())
+
+
+class VideoUploadsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Site videos can't be verified: no progress analyzer is configured."
+    default_code = 'video_uploads_unavailable'
+
+
+class VideoUploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "The upload is too large."
+    default_code = 'video_upload_too_large'
+
+
+class SiteVideoListCreateAPIView(generics.ListCreateAPIView):
+    """
+    API view to list or upload site videos for one of the authenticated user's milestones.
+    - GET: List the milestone's videos with their processing status and verified progress
+    - POST: Upload a video (multipart field `video`). Answers 202 with the video 'pending';
+      `manage.py process_site_videos` analyzes it and records the progress against the milestone.
+    """
+    serializer_class = SiteVideoSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def get_milestone(self):
+        return get_object_or_404(Milestone, pk=self.kwargs['pk'], project__owner=self.request.user)
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False): # schema generation: no milestone pk or user
+            return SiteVideo.objects.none()
+        return SiteVideo.objects.filter(milestone=self.get_milestone()).select_related('progress_result')
+
+    def initial(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            # Before authentication, which may already read the body (the session CSRF check).
+            if not getattr(settings, 'PROGRESS_FRAME_ANALYZER', None):
+                raise VideoUploadsUnavailable()
+            max_bytes = getattr(settings, 'VIDEO_UPLOAD_MAX_BYTES', 1024 ** 3)
+            try:
+                content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                content_length = 0
+            if content_length > max_bytes:
+                raise VideoUploadTooLarge(f"Videos can be at most {filesizeformat(max_bytes)}.")
+            # Stream the upload to a temporary file instead of memory; saving the model then moves it into MEDIA_ROOT.
+            request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        super().initial(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        self.milestone = self.get_milestone() # 404 before the upload is parsed
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED # stored; processed out of band
+        return response
+
+    def perform_create(self, serializer):
+        serializer.save(milestone=self.milestone, uploaded_by=self.request.user)
+
+
+# --- Archive (read-only) ---
+
+class ArchivedPaymentPagination(CursorPagination):
+    """
+    Cursor pagination for the archive, newest first: each page continues from the last date seen
+    instead of an OFFSET, so deep pages cost the same as the first. Follows the (user, -payment_date) index.
+    """
+    page_size = 100
+    ordering = ('-payment_date', '-id')
+
+
+class ArchivedTransactionPagination(ArchivedPaymentPagination):
+    """
+    Same for archived transactions, following the transaction_date index.
+    """
+    ordering = ('-transaction_date', '-id')
+
+
+class ArchivedPaymentListAPIView(generics.ListAPIView):
+    """
+    API view to list the authenticated user's archived (settled, older) payments.
+    - GET: List archived payments, newest first, cursor-paginated
+    """
+    serializer_class = ArchivedPaymentSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ArchivedPaymentPagination
+
+    def get_queryset(self):
+        return (ArchivedPayment.objects.filter(user=self.request.user)
+                .select_related('user').prefetch_related('transactions'))
+
+
+class ArchivedPaymentDetailAPIView(generics.RetrieveAPIView):
+    """
+    API view to retrieve a single archived payment. Only accessible by its owner.
+    """
+    serializer_class = ArchivedPaymentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False): # schema generation: no request user
+            return ArchivedPayment.objects.none()
+        return (ArchivedPayment.objects.filter(user=self.request.user)
+                .select_related('user').prefetch_related('transactions'))
+
+
+class ArchivedTransactionListAPIView(generics.ListAPIView):
+    """
+    API view to list archived transactions of the authenticated user's archived payments.
+    """
+    serializer_class = ArchivedTransactionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ArchivedTransactionPagination
+
+    def get_queryset(self):
+        return ArchivedTransaction.objects.filter(payment__user=self.request.user)
+
+
+class OutboxStubReceiverAPIView(APIView):
+    """
+    Local stand-in for a downstream system, for use with payments.outbox.HTTPSink during development.
+    Mounted only when DEBUG is on.
+    - POST: Accept a JSON array of outbox events.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = [] # Machine-to-machine POSTs: no session, so no CSRF check
+
+    def post(self, request, *args, **kwargs):
+        return Response({'received': len(request.data)}, status=status.HTTP_202_ACCEPTED)